@@ -1,7 +1,8 @@
 '''
 Useful Overlay by Malek Mansour
 Displays system stats, microphone level, Spotify track, and a timer in an always-on-top overlay.
-Hotkeys (Numpad): 7, 8, 9
+Hotkeys (Numpad): 6, 7, 8, 9
+- Numpad 6: App usage today / last 7 days
 - Numpad 7: Start/Pause/Reset Timer 
 - Numpad 8: Cycle Overlay Colour
 - Numpad 9: Full Restart Overlay
@@ -9,34 +10,60 @@ This program was developed and tested on Windows 10/11 with Python 3.8+.
 Requires: PyQt5, psutil, sounddevice, numpy, winsdk, pynput, pywin32, GPUtil
 Usage:
     python UsefulOverlay.py
+    python UsefulOverlay.py --write-config   (writes UsefulOverlay.json with all defaults)
+    python UsefulOverlay.py --usage          (app usage today and over the last 7 days)
+    python UsefulOverlay.py --term           (status line in the terminal, no Qt)
+    python UsefulOverlay.py --i3bar          (i3bar / swaybar status_command)
+    python UsefulOverlay.py --waybar         (waybar custom module, JSON lines)
+Widgets, order, refresh intervals and styling are read from UsefulOverlay.json
+next to the script and reloaded live when the file changes.
 '''
 
 import ctypes
-ctypes.windll.user32.SetProcessDPIAware()
 import sys
+if sys.platform == "win32":
+    ctypes.windll.user32.SetProcessDPIAware()
 import asyncio
-import pythoncom
+import json
 import psutil
 import time
 import datetime
+import itertools
+import math
 import numpy as np
-import sounddevice as sd
-import winsdk.windows.media.control as wmc
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QHBoxLayout
-from pynput import keyboard
 import threading
-import win32gui, win32process
 import psutil as ps
 
-try:
-    import GPUtil
-    gpu_available = True
-except:
-    gpu_available = False
-
 import os
+import shutil
 import traceback
+from overlay_reader import SHM_NAME, SnapshotWriter
+from overlay_net import DEFAULT_PORT, STALE_S, Agent as NetAgent, Aggregator, format_hosts, parse_address
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Qt is only loaded for the window, the terminal / status-bar renderers run
+# headless without it (the widget classes below are then never instantiated)
+HEADLESS_FLAGS = ("--term", "--i3bar", "--waybar")
+HEADLESS = any(flag in sys.argv for flag in HEADLESS_FLAGS)
+if not HEADLESS:
+    from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal
+    from PyQt5.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPalette, QPixmap
+    from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QHBoxLayout
+else:
+    Qt = QEvent = QTimer = QColor = QFont = QFontMetrics = QImage = QPainter = QPalette = QPixmap = None
+    QHBoxLayout = None
+    pyqtSignal = lambda *types: None
+    QApplication = QWidget = QLabel = object
+
+# Optional / platform modules, imported by the probe that needs them so a
+# disabled widget never loads its dependency (see make_*_probe below).
+pythoncom = None
+wmc = None
+sd = None
+GPUtil = None
+win32gui = win32process = None
+gpu_available = False
 
 # Colour Cycle
 COLOR_CYCLE = [
@@ -56,13 +83,26 @@ stats = {
     "battery": "Battery: --%",
     "ram": "RAM: --%",
     "gpu": "GPU: --%",
+    "thermal": "Temp: --",
+    "hosts": "Hosts: --",
+    "space": "Space: --",
     "cpu": "CPU: --%",
+    "cpu_cells": b"",
+    "cpu_cost_us": 0.0,
+    "net": "Net: --",
+    "disk": "Disk: --",
     "app": "App: —",
     "date": "Date: --/--/----",
     "time": "Time: --:--",
     "mic_bars": 0,
     "mic_percent": 0,
-    "spotify": "Spotify: —"
+    "spotify": "Spotify: —",
+    "art": None,
+    "art_stats": "",
+    "media_timeline": None,
+    "mic_spectrum": b"",
+    "mic_spectrum_cost_us": 0.0,
+    "alerts": (),
 }
 _worker_stop = False
 
@@ -101,16 +141,15 @@ def timer_get_seconds_int():
             total += time.time() - _timer_start_time
         return int(total)
 
-# Spotify helper 
-async def _spotify_get_async():
-    sessions = await wmc.GlobalSystemMediaTransportControlsSessionManager.request_async()
-    current = sessions.get_current_session()
-    if current is None:
-        return None
-    try:
-        props = await current.try_get_media_properties_async()
-    except Exception:
-        return None
+# Media sessions
+# One session manager for the life of the probe. Each session's properties are
+# cached and only re-read after its media_properties_changed event; playback
+# state and timeline are cheap sync reads done on every poll. The session that
+# is actually playing wins over whatever Windows calls "current".
+SPOTIFY_TTL = 3.0
+MEDIA_PLAYING = 4   # GlobalSystemMediaTransportControlsSessionPlaybackStatus.PLAYING
+
+def _format_track(props):
     artist = getattr(props, "artist", "") or ""
     title = getattr(props, "title", "") or ""
     if not artist and not title:
@@ -121,265 +160,3487 @@ async def _spotify_get_async():
         if albumartist and not artist:
             artist = albumartist
     if not artist and not title:
-        return None
+        return None, None
     a = artist.strip()
     t = title.strip()
+    key = (a, t, getattr(props, "album_title", "") or "")
     if a and t:
-        return f"{a} – {t}"
+        return f"{a} – {t}", key
     elif t:
-        return f"{t}"
+        return f"{t}", key
     elif a:
-        return f"{a}"
-    return None
-
-def spotify_now_playing():
-    try:
+        return f"{a}", key
+    return None, None
+
+class MediaSession:
+    def __init__(self, session):
+        self.session = session
+        self.app_id = session.source_app_user_model_id
+        self.dirty = True
+        self.text = None
+        self.key = None
+        self.thumbnail = None
+        self.playing = False
+        self.playing_since = 0.0
+        self.last_playing = 0.0
+        self.rate = 1.0
+        self._token = None
         try:
-            pythoncom.CoInitialize()
+            self._token = session.add_media_properties_changed(self._on_props_changed)
         except Exception:
-            pass
+            pass    # no events, properties are re-read on every poll
+
+    def _on_props_changed(self, sender, args):
+        self.dirty = True
+
+    def update(self, session):
+        # the manager hands out new wrappers, keep the newest one
+        self.session = session
+        if self._token is None:
+            self.dirty = True
+
+    def close(self):
+        if self._token is not None:
+            try:
+                self.session.remove_media_properties_changed(self._token)
+            except Exception:
+                pass
+            self._token = None
+
+class MediaEngine:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.manager = None
+        self.sessions = {}
+        self._sessions_dirty = True
+        self._sessions_token = None
+        self.active = None
+
+    def _on_sessions_changed(self, sender, args):
+        self._sessions_dirty = True
+
+    def poll(self, art=None):
         try:
-            return asyncio.run(_spotify_get_async())
+            return self.loop.run_until_complete(self._poll_async(art))
         except Exception:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            # explorer restart, RPC failure... start over next poll
+            self.reset()
+            raise
+
+    def reset(self):
+        for ms in self.sessions.values():
+            ms.close()
+        self.sessions = {}
+        self.manager = None
+        self._sessions_token = None
+        self._sessions_dirty = True
+        self.active = None
+
+    def _refresh_sessions(self):
+        seen = {}
+        for s in self.manager.get_sessions():
+            app_id = s.source_app_user_model_id
+            ms = self.sessions.pop(app_id, None)
+            if ms is None:
+                ms = MediaSession(s)
+            else:
+                ms.update(s)
+            seen[app_id] = ms
+        for ms in self.sessions.values():
+            ms.close()
+        self.sessions = seen
+
+    def _choose(self, current_id):
+        playing = [ms for ms in self.sessions.values() if ms.playing]
+        if playing:
+            for ms in playing:
+                if ms.app_id == current_id:
+                    return ms
+            # most recently started
+            return max(playing, key=lambda ms: ms.playing_since)
+        if current_id in self.sessions:
+            return self.sessions[current_id]
+        if self.sessions:
+            return max(self.sessions.values(), key=lambda ms: ms.last_playing)
+        return None
+
+    async def _poll_async(self, art):
+        if self.manager is None:
+            self.manager = await wmc.GlobalSystemMediaTransportControlsSessionManager.request_async()
             try:
-                return loop.run_until_complete(_spotify_get_async())
-            finally:
+                self._sessions_token = self.manager.add_sessions_changed(self._on_sessions_changed)
+            except Exception:
+                self._sessions_token = None
+        if self._sessions_dirty or self._sessions_token is None:
+            self._sessions_dirty = False
+            self._refresh_sessions()
+
+        now = time.monotonic()
+        for ms in self.sessions.values():
+            try:
+                info = ms.session.get_playback_info()
+                playing = info.playback_status == MEDIA_PLAYING
+                ms.rate = info.playback_rate or 1.0
+            except Exception:
+                playing = False
+            if playing and not ms.playing:
+                ms.playing_since = now
+            if playing:
+                ms.last_playing = now
+            ms.playing = playing
+
+        current = self.manager.get_current_session()
+        active = self._choose(current.source_app_user_model_id if current is not None else None)
+        self.active = active
+        if active is None:
+            return None
+
+        if active.dirty:
+            active.dirty = False
+            try:
+                props = await active.session.try_get_media_properties_async()
+                active.text, active.key = _format_track(props)
+                active.thumbnail = getattr(props, "thumbnail", None)
+            except Exception:
+                active.text = active.key = active.thumbnail = None
+
+        if art is not None:
+            art["key"] = active.key
+            art["data"] = None
+            if active.key is not None and active.thumbnail is not None and art["want"](active.key):
                 try:
-                    loop.close()
-                except:
-                    pass
-    finally:
+                    art["data"] = await _read_thumbnail_async(active.thumbnail)
+                except Exception:
+                    art["failed"](active.key)
+        return active
+
+    def timeline(self, ms):
+        # (position s, monotonic anchor, duration s, rate) or None, position
+        # extrapolated from the session's last_updated_time so the GUI can keep
+        # interpolating between polls
         try:
-            pythoncom.CoUninitialize()
+            tl = ms.session.get_timeline_properties()
+            start = tl.start_time.total_seconds()
+            duration = tl.end_time.total_seconds() - start
+            if duration <= 0:
+                return None
+            pos = tl.position.total_seconds() - start
+            rate = ms.rate if ms.playing else 0.0
+            if rate:
+                elapsed = (datetime.datetime.now(datetime.timezone.utc) - tl.last_updated_time).total_seconds()
+                if 0 <= elapsed <= duration:
+                    pos += elapsed * rate
+            return (max(0.0, min(pos, duration)), time.monotonic(), duration, rate)
         except Exception:
-            pass
-    return None
-
-# Mic level
+            return None
+
+# Album art
+# Thumbnail bytes are read with the media query, decoded and scaled to bar
+# height on a single background thread (QImage is fine off the GUI thread),
+# and kept in an LRU keyed by (artist, title, album, height).
+ART_CACHE_MB = 4
+
+async def _read_thumbnail_async(thumbnail):
+    from winsdk.windows.storage.streams import Buffer, DataReader, InputStreamOptions
+    stream = await thumbnail.open_read_async()
+    # read_async hands back the buffer holding the data, not necessarily the one passed in
+    buf = await stream.read_async(Buffer(stream.size), stream.size, InputStreamOptions.READ_AHEAD)
+    data = bytearray(buf.length)
+    DataReader.from_buffer(buf).read_bytes(data)
+    return bytes(data)
+
+class AlbumArtCache:
+    def __init__(self, max_bytes=ART_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.decode_ms = 0.0     # ewma
+        self.decodes = 0
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def put(self, key, img):
+        size = img.sizeInBytes() if hasattr(img, "sizeInBytes") else img.byteCount()
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = img
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= old.sizeInBytes() if hasattr(old, "sizeInBytes") else old.byteCount()
+
+    def note_decode(self, ms):
+        self.decodes += 1
+        self.decode_ms = ms if self.decodes == 1 else self.decode_ms * 0.8 + ms * 0.2
+
+    def stats_text(self):
+        lookups = self.hits + self.misses
+        rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return (f"art cache: {len(self._items)} items, {self._bytes // 1024} KB, "
+                f"hit rate {rate:.0f}% ({self.hits}/{lookups}), decode {self.decode_ms:.1f} ms avg")
+
+def decode_album_art(data, height):
+    img = QImage.fromData(data)
+    if img.isNull():
+        return None
+    return img.scaledToHeight(height, Qt.SmoothTransformation).convertToFormat(
+        QImage.Format_ARGB32_Premultiplied)
+
+# Audio engine
+# One persistent input stream per metered device (default mic, named mics,
+# output loopback). Stream callbacks run the meter ballistics on every block;
+# the probe only reads the latest state at whatever rate it runs. Hotplug /
+# default-device changes are spotted from the MMDevices registry keys' write
+# times, a stream that dies on its own is reopened by itself.
 MIC_NOISE_FLOOR = 0.005      
-MIC_ATTACK = 0.9
-MIC_RELEASE = 0.4
-_smoothed_level = 0.0
+MIC_ATTACK_MS = 20.0         # time constants, independent of loop and UI rate
+MIC_RELEASE_MS = 100.0
+MIC_PEAK_HOLD_MS = 1000.0
+MIC_PEAK_FALL = 1.5          # full scale per second once the hold runs out
+MIC_CLIP_LEVEL = 0.99        # sample magnitude that lights the clip indicator
+MIC_CLIP_HOLD_MS = 1500.0
+MIC_SAMPLERATE = 16000
+MIC_BLOCK_MS = 20
+AUDIO_DEVICE_POLL = 2.0
+LOOPBACK_INPUT_NAMES = ("stereo mix", "loopback", "what u hear", "wave out mix")
+
+def mic_target_from_rms(rms, noise_floor):
+    # Silence
+    if rms < noise_floor:
+        return 0.0
+    # EXTREME BOOST
+    boosted = rms * 100.0
+    # Soft compression so it doesn't instantly hit 100%
+    compressed = boosted / (1 + boosted)
+    return max(0.0, min(compressed, 1.0))
+
+# Auto gain
+# Noise floor and loud level tracked per device as streaming quantiles of the
+# block RMS in dB: each block nudges an estimate up by step*q or down by
+# step*(1-q), which settles where a fraction q of recent blocks is below it.
+# Constant memory, O(1) per block, and the constant step forgets old blocks,
+# so it follows a rolling window of a few minutes. Estimates are saved per
+# device and restored when that device is opened again.
+AUTO_GAIN_LOW_Q = 0.10       # quantile of all blocks used as the noise floor
+AUTO_GAIN_HIGH_Q = 0.95      # quantile of blocks above the floor shown near the top
+AUTO_GAIN_STEP_DB = 0.02
+AUTO_GAIN_MARGIN_DB = 3.0    # above the floor before the meter moves
+AUTO_GAIN_MIN_RANGE_DB = 20.0
+AUTO_GAIN_TARGET = 0.8       # meter level the high quantile maps to
+AUTO_GAIN_SAVE_INTERVAL = 60.0
+CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "UsefulOverlay.calibration.json")
+
+class AutoGain:
+    def __init__(self, low_db=20 * math.log10(MIC_NOISE_FLOOR), high_db=-20.0, step_db=AUTO_GAIN_STEP_DB):
+        self.low_db = low_db
+        self.high_db = high_db
+        self.step = step_db
+        self.blocks = 0
+
+    def level(self, rms):
+        db = 20.0 * math.log10(rms + 1e-9)
+        step = self.step
+        self.low_db += step * (AUTO_GAIN_LOW_Q - (1.0 if db < self.low_db else 0.0))
+        self.blocks += 1
+        floor = self.low_db + AUTO_GAIN_MARGIN_DB
+        if db <= floor:
+            return 0.0
+        self.high_db += step * (AUTO_GAIN_HIGH_Q - (1.0 if db < self.high_db else 0.0))
+        top = max(self.high_db, floor + AUTO_GAIN_MIN_RANGE_DB)
+        return min(1.0, (db - floor) / (top - floor) * AUTO_GAIN_TARGET)
+
+    def state(self):
+        return {"low_db": round(self.low_db, 2), "high_db": round(self.high_db, 2)}
+
+def load_calibration(path=CALIBRATION_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {k: v for k, v in data.items() if isinstance(v, dict)}
+    except (OSError, ValueError):
+        return {}
+
+def save_calibration(data, path=CALIBRATION_PATH):
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"calibration: {e}")
+
+class MeterBallistics:
+    # Attack/release smoothing, peak hold and clip indicator advanced once per
+    # audio block. Coefficients come from time constants and the block length,
+    # so the meter behaves the same however often it is read.
+    def __init__(self, samplerate, attack_ms=MIC_ATTACK_MS, release_ms=MIC_RELEASE_MS,
+                 peak_hold_ms=MIC_PEAK_HOLD_MS, peak_fall=MIC_PEAK_FALL, clip_level=MIC_CLIP_LEVEL,
+                 clip_hold_ms=MIC_CLIP_HOLD_MS, noise_floor=MIC_NOISE_FLOOR, auto_gain=None):
+        self.samplerate = samplerate
+        self.auto_gain = auto_gain
+        self.attack_ms = attack_ms
+        self.release_ms = release_ms
+        self.peak_hold_ms = peak_hold_ms
+        self.peak_fall = peak_fall
+        self.clip_level = clip_level
+        self.clip_hold_ms = clip_hold_ms
+        self.noise_floor = noise_floor
+        self._coeffs = {}
+        self.level = 0.0
+        self.peak = 0.0
+        self._hold = 0.0
+        self._clip = 0.0
+        # (level, peak, clipping) replaced as one tuple so readers on other
+        # threads never see a half-updated state
+        self.state = (0.0, 0.0, False)
+
+    def _coefficients(self, frames):
+        # blocks are normally all the same size, so this is one dict lookup
+        c = self._coeffs.get(frames)
+        if c is None:
+            dt = frames / self.samplerate
+            att = 1.0 - math.exp(-dt * 1000.0 / self.attack_ms) if self.attack_ms > 0 else 1.0
+            rel = 1.0 - math.exp(-dt * 1000.0 / self.release_ms) if self.release_ms > 0 else 1.0
+            c = self._coeffs[frames] = (att, rel, dt, self.peak_fall * dt)
+        return c
+
+    def process(self, block):
+        att, rel, dt, fall = self._coefficients(len(block))
+        rms = float(np.sqrt(np.mean(block * block)))
+        if self.auto_gain is not None:
+            target = self.auto_gain.level(rms)
+        else:
+            target = mic_target_from_rms(rms, self.noise_floor)
+        level = self.level
+        level += (target - level) * (att if target > level else rel)
+        self.level = level
+
+        if level >= self.peak:
+            self.peak = level
+            self._hold = self.peak_hold_ms / 1000.0
+        elif self._hold > 0.0:
+            self._hold -= dt
+        else:
+            self.peak = max(level, self.peak - fall)
+
+        if float(np.max(np.abs(block))) >= self.clip_level:
+            self._clip = self.clip_hold_ms / 1000.0
+        elif self._clip > 0.0:
+            self._clip -= dt
+        self.state = (level, self.peak, self._clip > 0.0)
+
+    def reset(self):
+        self.level = self.peak = self._hold = self._clip = 0.0
+        self.state = (0.0, 0.0, False)
+
+class AudioMeter:
+    def __init__(self, name, opts, spectrum_opts=None):
+        self.name = name
+        self.device = opts.get("device")
+        self.loopback = bool(opts.get("loopback", False))
+        self.opts = opts
+        self.auto_gain = None
+        self.calibration_key = None
+        self.spectrum_opts = spectrum_opts
+        self.spectrum = None
+        self.ballistics = None
+        self.stream = None
+        self.device_name = None
+        self.failed = False
+        self.blocks = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        self.ballistics.process(indata)
+        self.blocks += 1
+        if self.spectrum is not None:
+            self.spectrum.push(indata[:, 0])
+
+    def _finished(self):
+        self.failed = True
+
+    def _resolve(self):
+        # returns (device index, extra_settings)
+        kind = "output" if self.loopback else "input"
+        devices = sd.query_devices()
+        if self.loopback:
+            try:
+                extra = sd.WasapiSettings(loopback=True)
+            except TypeError:
+                extra = None
+            if extra is not None:
+                wasapi = [i for i, h in enumerate(sd.query_hostapis()) if "WASAPI" in h["name"]]
+                for i, d in enumerate(devices):
+                    if d["hostapi"] in wasapi and d["max_output_channels"] > 0 and (
+                            self.device is None and i == sd.query_hostapis(d["hostapi"])["default_output_device"]
+                            or isinstance(self.device, str) and self.device.lower() in d["name"].lower()
+                            or self.device == i):
+                        return i, extra
+            # no WASAPI loopback in this PortAudio build, use a "Stereo Mix" style input
+            for i, d in enumerate(devices):
+                if d["max_input_channels"] > 0 and any(n in d["name"].lower() for n in LOOPBACK_INPUT_NAMES):
+                    return i, None
+            raise RuntimeError("no loopback capture device")
+        if self.device is None:
+            return sd.query_devices(kind=kind)["index"], None
+        if isinstance(self.device, int):
+            return self.device, None
+        for i, d in enumerate(devices):
+            if d["max_input_channels"] > 0 and self.device.lower() in d["name"].lower():
+                return i, None
+        raise RuntimeError(f"no input device matching {self.device!r}")
+
+    def open(self, calibration=None):
+        self.close()
+        self.failed = False
+        index, extra = self._resolve()
+        info = sd.query_devices(index)
+        channels = info["max_output_channels"] if extra is not None else info["max_input_channels"]
+        samplerate = MIC_SAMPLERATE if self.device is None and not self.loopback else int(info["default_samplerate"])
+        o = self.opts
+        self.auto_gain = None
+        if o.get("auto_gain", True):
+            # restore what this device settled on last time
+            self.calibration_key = info["name"] + (" (loopback)" if self.loopback else "")
+            saved = (calibration or {}).get(self.calibration_key) or {}
+            self.auto_gain = AutoGain(**{k: float(v) for k, v in saved.items() if k in ("low_db", "high_db")})
+        self.ballistics = MeterBallistics(
+            samplerate, float(o.get("attack_ms", MIC_ATTACK_MS)), float(o.get("release_ms", MIC_RELEASE_MS)),
+            float(o.get("peak_hold_ms", MIC_PEAK_HOLD_MS)), float(o.get("peak_fall", MIC_PEAK_FALL)),
+            float(o.get("clip_level", MIC_CLIP_LEVEL)), float(o.get("clip_hold_ms", MIC_CLIP_HOLD_MS)),
+            float(o.get("noise_floor", MIC_NOISE_FLOOR)), self.auto_gain)
+        if self.spectrum_opts is not None:
+            o = self.spectrum_opts
+            self.spectrum = SpectrumAnalyzer(samplerate, int(o["window"]), int(o["bands"]), float(o["fmin"]),
+                                             float(o["db_floor"]), float(o["db_ceiling"]))
+        self.stream = sd.InputStream(device=index, channels=max(1, min(2, channels)),
+                                     samplerate=samplerate, dtype="float32",
+                                     blocksize=int(samplerate * MIC_BLOCK_MS / 1000),
+                                     callback=self._callback, finished_callback=self._finished,
+                                     extra_settings=extra)
+        self.stream.start()
+        self.device_name = info["name"]
+
+    def close(self):
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+        if self.ballistics is not None:
+            self.ballistics.reset()
 
-def get_mic_level_blocking():
-    global _smoothed_level
+    def healthy(self):
+        return self.stream is not None and not self.failed and self.stream.active
 
-    try:
-        duration = 0.04
-        sr = 16000
-        audio = sd.rec(int(duration * sr), samplerate=sr, channels=1,
-                       dtype='float32', blocking=True)
+    def read(self):
+        # latest (level, peak, clipping); the display just samples it
+        if not self.healthy():
+            return 0.0, 0.0, False
+        return self.ballistics.state
 
-        if audio is None or audio.size == 0:
-            return 0, 0
+class AudioDeviceWatcher:
+    # default-device and hotplug changes rewrite values under the endpoint keys,
+    # so their last-write times are a cheap change signature
+    KEYS = (r"SOFTWARE\Microsoft\Windows\CurrentVersion\MMDevices\Audio\Capture",
+            r"SOFTWARE\Microsoft\Windows\CurrentVersion\MMDevices\Audio\Render")
 
-        rms = float(np.sqrt(np.mean(audio**2)))
+    def __init__(self):
+        try:
+            import winreg
+            self._winreg = winreg
+        except ImportError:
+            self._winreg = None
+        self._sig = self.signature()
+
+    def signature(self):
+        winreg = self._winreg
+        if winreg is None:
+            return None
+        sig = []
+        try:
+            for path in self.KEYS:
+                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path) as key:
+                    for i in range(winreg.QueryInfoKey(key)[0]):
+                        sub = winreg.EnumKey(key, i)
+                        with winreg.OpenKey(key, sub) as sk:
+                            sig.append((sub, winreg.QueryInfoKey(sk)[2]))
+        except OSError:
+            return None
+        return tuple(sig)
+
+    def changed(self):
+        sig = self.signature()
+        if sig == self._sig:
+            return False
+        self._sig = sig
+        return True
+
+class AudioEngine:
+    def __init__(self, meters):
+        self.meters = meters
+        self.watcher = AudioDeviceWatcher()
+        self._next_check = 0.0
+        self.calibration = load_calibration()
+        self._next_save = time.monotonic() + AUTO_GAIN_SAVE_INTERVAL
+
+    def start(self):
+        for m in self.meters:
+            self._open(m)
+
+    def _remember(self, meter):
+        # current estimate into the per-device table, True if it moved
+        if meter.auto_gain is None or not meter.auto_gain.blocks:
+            return False
+        state = meter.auto_gain.state()
+        if self.calibration.get(meter.calibration_key) == state:
+            return False
+        self.calibration[meter.calibration_key] = state
+        return True
+
+    def save_calibration(self):
+        changed = False
+        for m in self.meters:
+            changed = self._remember(m) or changed
+        if changed:
+            save_calibration(self.calibration)
+
+    def _open(self, meter):
+        self._remember(meter)
+        try:
+            meter.open(self.calibration)
+        except Exception as e:
+            meter.close()
+            meter.failed = True
+            print(f"audio: {meter.name}: {e}")
+
+    def _rescan(self):
+        # PortAudio only re-enumerates devices on re-initialisation, which also
+        # closes every stream, so a device-list change reopens all meters
+        for m in self.meters:
+            self._remember(m)
+            m.close()
+        try:
+            sd._terminate()
+            sd._initialize()
+        except Exception:
+            traceback.print_exc()
+        self.start()
 
-        # Silence
-        if rms < MIC_NOISE_FLOOR:
-            target = 0.0
+    def poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now < self._next_check:
+            return
+        self._next_check = now + AUDIO_DEVICE_POLL
+        if now >= self._next_save:
+            self._next_save = now + AUTO_GAIN_SAVE_INTERVAL
+            self.save_calibration()
+        if self.watcher.changed():
+            self._rescan()
+            return
+        for m in self.meters:
+            if not m.healthy():
+                self._open(m)
+
+    def stop(self):
+        self.save_calibration()
+        for m in self.meters:
+            m.close()
+
+# Mic spectrum
+# Log-spaced band levels from an rfft over a sliding window, computed once per
+# audio block. Window, band edges and scratch buffers are built once; the GUI
+# only ever reads the latest `levels` bytes.
+SPECTRUM_BANDS = 16
+SPECTRUM_WINDOW = 1024
+SPECTRUM_FMIN = 60.0
+SPECTRUM_DB_FLOOR = -90.0
+SPECTRUM_DB_CEILING = -30.0
+
+class SpectrumAnalyzer:
+    def __init__(self, samplerate=MIC_SAMPLERATE, window=SPECTRUM_WINDOW, bands=SPECTRUM_BANDS,
+                 fmin=SPECTRUM_FMIN, db_floor=SPECTRUM_DB_FLOOR, db_ceiling=SPECTRUM_DB_CEILING):
+        self.window = window
+        self._buf = np.zeros(window, dtype=np.float32)
+        self._windowed = np.zeros(window, dtype=np.float32)
+        self._hann = np.hanning(window).astype(np.float32)
+
+        # fft bin index of each band edge, at least one bin per band
+        n_bins = window // 2 + 1
+        edges = np.geomspace(fmin, samplerate / 2, bands + 1)
+        idx = np.clip(np.round(edges * window / samplerate).astype(int), 1, n_bins - 1)
+        for i in range(1, len(idx)):
+            idx[i] = max(idx[i], idx[i - 1] + 1)
+        idx = idx[idx < n_bins]
+        self._starts = idx[:-1]
+        self._stop = idx[-1]
+        self._counts = np.diff(idx).astype(np.float32)
+        self.bands = len(self._starts)
+
+        # full-scale sine through a hann window peaks at window / 4
+        self._ref = 1.0 / (window / 4.0) ** 2
+        self._db_floor = db_floor
+        self._db_span = max(1.0, db_ceiling - db_floor)
+        self.levels = bytes(self.bands)
+        self.cost_us = 0.0
+
+    def push(self, block):
+        t0 = time.perf_counter()
+        n = len(block)
+        buf = self._buf
+        if n >= self.window:
+            buf[:] = block[-self.window:]
         else:
-            # EXTREME BOOST
-            boosted = rms * 100.0   
-
-            # Soft compression so it doesn't instantly hit 100%
-            compressed = boosted / (1 + boosted)
+            buf[:-n] = buf[n:]
+            buf[-n:] = block
+        np.multiply(buf, self._hann, out=self._windowed)
+        spec = np.fft.rfft(self._windowed)
+        power = (spec.real ** 2 + spec.imag ** 2)[:self._stop]
+        band = np.add.reduceat(power, self._starts) / self._counts
+        db = 10.0 * np.log10(band * self._ref + 1e-12)
+        level = np.clip((db - self._db_floor) / self._db_span, 0.0, 1.0)
+        self.levels = (level * 255).astype(np.uint8).tobytes()
+
+        cost = (time.perf_counter() - t0) * 1e6
+        self.cost_us = cost if not self.cost_us else self.cost_us * 0.95 + cost * 0.05
+
+def bench_spectrum(n=5000, block=640):
+    analyzer = SpectrumAnalyzer()
+    blocks = (np.random.default_rng(0).standard_normal((16, block)) * 0.05).astype(np.float32)
+    t0 = time.perf_counter()
+    for i in range(n):
+        analyzer.push(blocks[i % 16])
+    per = (time.perf_counter() - t0) / n * 1e6
+    print(f"spectrum: {analyzer.window}-pt window, {analyzer.bands} bands, "
+          f"{block}-sample blocks, {per:.1f} us/block")
+
+# Per-core CPU
+# Busy fraction per core from cpu_times(percpu=True) deltas, no sleeping.
+# Cores are folded into at most CPU_HEATMAP_CELLS cells (max per group), so
+# a 128-thread machine draws the same size strip as a laptop.
+CPU_HEATMAP_CELLS = 32
+CPU_HEATMAP_CELL_W = 4
+
+class PerCoreCpuSampler:
+    def __init__(self, max_cells=CPU_HEATMAP_CELLS):
+        self.max_cells = max_cells
+        self._reset(psutil.cpu_times(percpu=True))
+
+    def _reset(self, first):
+        fields = first[0]._fields
+        self.n_cores = len(first)
+        self._idle_cols = [fields.index(f) for f in ("idle", "iowait") if f in fields]
+        # Linux already counts guest / guest_nice inside user / nice, psutil leaves them out too
+        self._total_cols = [i for i, f in enumerate(fields) if f not in ("guest", "guest_nice")]
+        self._prev = np.array(first, dtype=np.float64)
+        self._cur = np.empty_like(self._prev)
+        self.busy = np.zeros(self.n_cores)
+        self.total_percent = 0.0
+
+        # cell layout: groups of `group` cores, padded with zeros
+        self.group = -(-self.n_cores // self.max_cells)
+        self.n_cells = -(-self.n_cores // self.group)
+        self._padded = np.zeros(self.n_cells * self.group)
+        self.cells = bytes(self.n_cells)
+
+        self.cost_us = 0.0      # ewma of sample() cost
+        self.cost_max_us = 0.0
+
+    def sample(self):
+        t0 = time.perf_counter()
+        times = psutil.cpu_times(percpu=True)
+        if len(times) != self.n_cores:
+            # cpu hotplug / VM resize
+            self._reset(times)
+            return self.total_percent
+        self._cur[:] = times
+        delta = self._cur - self._prev
+        total = delta[:, self._total_cols].sum(axis=1)
+        idle = delta[:, self._idle_cols].sum(axis=1)
+        busy = np.divide(total - idle, total, out=np.zeros_like(total), where=total > 0)
+        np.clip(busy, 0.0, 1.0, out=busy)
+        self._prev, self._cur = self._cur, self._prev
+
+        all_total = total.sum()
+        if all_total > 0:
+            self.total_percent = 100.0 * float((total - idle).sum()) / float(all_total)
+            self.busy = busy
+            self._padded[:self.n_cores] = busy
+            levels = self._padded.reshape(self.n_cells, self.group).max(axis=1)
+            self.cells = (levels * 255).astype(np.uint8).tobytes()
+
+        cost = (time.perf_counter() - t0) * 1e6
+        self.cost_us = cost if not self.cost_us else self.cost_us * 0.95 + cost * 0.05
+        self.cost_max_us = max(self.cost_max_us, cost)
+        return self.total_percent
+
+def bench_cpu_sampler(n=2000):
+    sampler = PerCoreCpuSampler()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        sampler.sample()
+    per = (time.perf_counter() - t0) / n * 1e6
+    print(f"cpu sampler: {sampler.n_cores} cores -> {sampler.n_cells} cells, "
+          f"{per:.1f} us/sample avg, {sampler.cost_max_us:.1f} us max")
+
+# Network / Disk throughput
+# Raw counters are copied into preallocated arrays, rates come from deltas and
+# are smoothed with an EWMA. Sampled at IO_INTERVAL from the worker loop.
+IO_INTERVAL = 1.0
+IO_EWMA_ALPHA = 0.4
+NET_INTERFACES = None    # None = all non-loopback interfaces, or a list of names
+NET_PER_INTERFACE = False
+DISK_DEVICES = None      # None = all disks, or a list of names
+DISK_PER_DEVICE = False
+NET_EXCLUDE_PREFIXES = ("lo", "Loopback")
+# virtual / stacked block devices whose traffic is already counted on the disk below
+DISK_EXCLUDE_PREFIXES = ("loop", "zram", "ram", "dm-", "md")
+SYS_BLOCK = "/sys/block"
+
+def is_whole_disk(name, sys_block=SYS_BLOCK):
+    # perdisk counters also list partitions on Linux, only whole disks have a
+    # /sys/block entry; other platforms report whole disks already
+    if not os.path.isdir(sys_block):
+        return True
+    return os.path.exists(os.path.join(sys_block, name))
+
+class IoRateMeter:
+    def __init__(self, read_counters, fields, devices=None, exclude=(), alpha=IO_EWMA_ALPHA, keep=None):
+        self._read = read_counters
+        self._fields = fields
+        self._devices = devices
+        self._exclude = exclude
+        self._keep = keep          # extra name filter when no device list is given
+        self.alpha = alpha
+        self.names = []
+        self._keys = None
+        self._prev = np.zeros((0, len(fields)))
+        self._raw = np.zeros((0, len(fields)))
+        self._delta = np.zeros((0, len(fields)))
+        self.rates = np.zeros((0, len(fields)))
+        self._last_t = None
+
+    def _rebuild(self, counters):
+        old = dict(zip(self.names, self.rates))
+        if self._devices is not None:
+            self.names = [n for n in counters if n in self._devices]
+        else:
+            self.names = [n for n in counters
+                          if not n.startswith(self._exclude)
+                          and (self._keep is None or self._keep(n))]
+        shape = (len(self.names), len(self._fields))
+        self._raw = np.zeros(shape)
+        self._delta = np.zeros(shape)
+        self.rates = np.zeros(shape)
+        for i, n in enumerate(self.names):
+            if n in old:
+                self.rates[i] = old[n]
+        self._fill(counters, self._raw)
+        self._prev = self._raw.copy()
+
+    def _fill(self, counters, out):
+        fields = self._fields
+        for i, n in enumerate(self.names):
+            c = counters[n]
+            for j in range(len(fields)):
+                out[i, j] = getattr(c, fields[j])
+
+    def sample(self, now=None):
+        now = time.monotonic() if now is None else now
+        counters = self._read()
+        if not counters:
+            return
+        keys = counters.keys()
+        if keys != self._keys:
+            # interface or disk added / removed
+            self._keys = keys
+            self._rebuild(counters)
+            self._last_t = now
+            return
+        dt = now - self._last_t
+        if dt <= 0:
+            return
+        self._fill(counters, self._raw)
+        delta = self._delta
+        np.subtract(self._raw, self._prev, out=delta)
+        neg = delta < 0
+        if neg.any():
+            # 32-bit counter wrap if the old value was near the top, otherwise a reset
+            wrapped = neg & (self._prev >= 2**31) & (self._prev < 2**32)
+            delta[wrapped] += 2**32
+            delta[neg & ~wrapped] = 0.0
+        delta /= dt
+        self.rates += self.alpha * (delta - self.rates)
+        self._prev, self._raw = self._raw, self._prev
+        self._last_t = now
+
+    def total(self):
+        return self.rates.sum(axis=0)
+
+def format_rate(bps):
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bps < 1000:
+            return f"{bps:.0f} {unit}" if unit == "B/s" else f"{bps:.1f} {unit}"
+        bps /= 1024
+    return f"{bps:.1f} GB/s"
+
+def format_io_text(meter, label, arrows, per_device):
+    if per_device and len(meter.names) > 0:
+        return "  ".join(
+            f"{name}: {arrows[0]}{format_rate(r[0])} {arrows[1]}{format_rate(r[1])}"
+            for name, r in zip(meter.names, meter.rates))
+    r = meter.total() if len(meter.names) else (0.0, 0.0)
+    return f"{label}: {arrows[0]}{format_rate(r[0])} {arrows[1]}{format_rate(r[1])}"
+
+# Disk space
+# The mount list is only re-read when the mounts change (Linux: poll() on
+# /proc/self/mounts, Windows: the GetLogicalDrives bitmask). The mount list and
+# each volume's disk_usage run on a short-lived thread of their own, never on
+# the worker loop, so a hung network or sleeping volume only holds its own
+# thread. A volume whose query takes longer than its timeout keeps its last
+# value, marked stale, and isn't queried again until the stuck call returns.
+SPACE_INTERVAL = 30.0        # seconds between usage queries per volume
+SPACE_TIMEOUT = 2.0
+SPACE_FSTYPES_SKIP = ("squashfs", "tmpfs", "devtmpfs", "overlay", "iso9660", "udf")
+
+class MountWatcher:
+    def __init__(self):
+        self._poll = None
+        self._fd = None
+        self._sig = None
+        if sys.platform.startswith("linux"):
+            try:
+                import select
+                self._fd = os.open("/proc/self/mounts", os.O_RDONLY)
+                self._poll = select.poll()
+                self._poll.register(self._fd, select.POLLPRI | select.POLLERR)
+            except (OSError, AttributeError, ImportError):
+                self._poll = None
+        if self._poll is None:
+            self._sig = self.signature()
+
+    def signature(self):
+        if sys.platform == "win32":
+            return ctypes.windll.kernel32.GetLogicalDrives()
+        return None
 
-            target = max(0.0, min(compressed, 1.0))
+    def changed(self):
+        if self._poll is not None:
+            if not self._poll.poll(0):
+                return False
+            # the event stays raised until the file is read again
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            while os.read(self._fd, 65536):
+                pass
+            return True
+        sig = self.signature()
+        if sig == self._sig:
+            return False
+        self._sig = sig
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+def list_volumes(wanted=None):
+    # mountpoints worth showing, or the configured ones that are mounted
+    parts = psutil.disk_partitions(all=False)
+    mounts = [p.mountpoint for p in parts
+              if p.fstype and p.fstype not in SPACE_FSTYPES_SKIP and "cdrom" not in p.opts]
+    if wanted:
+        norm = {m.rstrip("\\/").lower() or m: m for m in mounts}
+        return [norm[w.rstrip("\\/").lower() or w] for w in wanted if (w.rstrip("\\/").lower() or w) in norm]
+    return mounts
+
+class SpaceMonitor:
+    def __init__(self, volumes=None, interval=SPACE_INTERVAL, timeout=SPACE_TIMEOUT, usage=None):
+        self.wanted = volumes
+        self.interval = interval
+        self.timeout = timeout
+        self._usage = usage or psutil.disk_usage
+        self.watcher = MountWatcher()
+        self.volumes = {}        # mountpoint -> [future, submitted, next_query, usage, stale]
+        self._mounts = self._submit(list_volumes, self.wanted)
+
+    @staticmethod
+    def _submit(fn, arg):
+        # at most one call per volume (and one mount listing) is ever outstanding,
+        # so a thread each stays bounded and nothing queues behind a hung call
+        future = Future()
+        def run():
+            try:
+                future.set_result(fn(arg))
+            except BaseException as e:
+                future.set_exception(e)
+        threading.Thread(target=run, name="overlay-space", daemon=True).start()
+        return future
+
+    def poll(self, now=None):
+        # never waits: collects finished queries and starts due ones
+        now = time.monotonic() if now is None else now
+        if self.watcher.changed() and self._mounts is None:
+            self._mounts = self._submit(list_volumes, self.wanted)
+        if self._mounts is not None and self._mounts.done():
+            try:
+                mounts = self._mounts.result()
+                self.volumes = {m: self.volumes.get(m) or [None, 0.0, 0.0, None, False] for m in mounts}
+            except Exception:
+                traceback.print_exc()
+            self._mounts = None
+        for mount, v in self.volumes.items():
+            future = v[0]
+            if future is not None:
+                if future.done():
+                    v[0] = None
+                    try:
+                        v[3] = future.result()
+                        v[4] = False
+                    except Exception:
+                        v[4] = True
+                elif now - v[1] > self.timeout:
+                    v[4] = True
+                    continue
+                else:
+                    continue
+            if now >= v[2]:
+                v[0] = self._submit(self._usage, mount)
+                v[1] = now
+                v[2] = now + self.interval
+
+    def rows(self):
+        # [(mountpoint, usage or None, stale)]
+        return [(m, v[3], v[4]) for m, v in self.volumes.items()]
+
+    def close(self):
+        # outstanding queries are daemon threads, a hung one is simply left behind
+        self.watcher.close()
+
+def format_space(rows):
+    parts = []
+    for mount, usage, stale in rows:
+        label = mount.rstrip("\\/") or mount
+        if usage is None:
+            parts.append(f"{label} --")
+            continue
+        mark = "?" if stale else ""
+        parts.append(f"{label} {format_bytes(usage.free)} free{mark}")
+    return "Space: " + ("  ".join(parts) if parts else "--")
+
+# Focused app process tree
+# pid -> entry index kept up to date by diffing psutil.pids() against the
+# known set: only processes that appeared since the last pass get opened, the
+# ones that exited are dropped. A focus change is then a walk over the index,
+# not a process_iter sweep. The app's root is the topmost ancestor with the
+# same executable name (browser / game launchers keep their helpers below it).
+APP_TREE_RESCAN = 1.0        # seconds between pid-list diffs
+
+class ProcessTreeIndex:
+    def __init__(self):
+        self.procs = {}          # pid -> [Process, ppid, name, create_time]
+        self.children = {}       # ppid -> set of pids
+        self._next_scan = 0.0
+        self.added = 0
+        self.removed = 0
 
-        # Smooth attack/release
-        if target > _smoothed_level:
-            _smoothed_level = (
-                _smoothed_level * (1 - MIC_ATTACK)
-                + target * MIC_ATTACK
-            )
+    def _add(self, pid):
+        try:
+            proc = ps.Process(pid)
+            with proc.oneshot():
+                entry = [proc, proc.ppid(), proc.name(), proc.create_time()]
+        except (ps.NoSuchProcess, ps.AccessDenied, ps.ZombieProcess, OSError):
+            return None
+        self.procs[pid] = entry
+        self.children.setdefault(entry[1], set()).add(pid)
+        self.added += 1
+        return entry
+
+    def _remove(self, pid):
+        entry = self.procs.pop(pid, None)
+        if entry is None:
+            return
+        siblings = self.children.get(entry[1])
+        if siblings is not None:
+            siblings.discard(pid)
+            if not siblings:
+                del self.children[entry[1]]
+        self.removed += 1
+
+    def refresh(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now < self._next_scan:
+            return
+        self._next_scan = now + APP_TREE_RESCAN
+        current = set(ps.pids())
+        known = self.procs.keys()
+        for pid in known - current:
+            self._remove(pid)
+        for pid in current - known:
+            self._add(pid)
+
+    def get(self, pid):
+        entry = self.procs.get(pid)
+        if entry is None:
+            entry = self._add(pid)
+        elif not entry[0].is_running():
+            # pid was reused by a new process between two scans
+            self._remove(pid)
+            entry = self._add(pid)
+        return entry
+
+    def root(self, pid):
+        entry = self.get(pid)
+        if entry is None:
+            return pid
+        seen = {pid}
+        parent = self.procs.get(entry[1])
+        while parent is not None and parent[2] == entry[2] and entry[1] not in seen:
+            # a parent must be older than its child, or the ppid is a reused pid
+            if parent[3] > entry[3]:
+                break
+            pid = entry[1]
+            seen.add(pid)
+            entry = parent
+            parent = self.procs.get(entry[1])
+        return pid
+
+    def tree(self, root):
+        # seen set: pid 0 is its own parent on Windows, and ppids can be stale
+        pids = [root]
+        seen = {root}
+        i = 0
+        while i < len(pids):
+            for child in self.children.get(pids[i], ()):
+                if child not in seen:
+                    seen.add(child)
+                    pids.append(child)
+            i += 1
+        return pids
+
+class AppTreeUsage:
+    # summed CPU (share of the whole machine, like the CPU field) and RSS of
+    # the focused app's process tree; CPU is None on the first sample after
+    # focus lands on a tree, its baselines are only being primed then
+    def __init__(self, index=None):
+        self.index = ProcessTreeIndex() if index is None else index
+        self.ncpu = ps.cpu_count() or 1
+        self._sampled = set()    # pids measured in the previous sample
+
+    def sample(self, pid):
+        index = self.index
+        index.refresh()
+        root = index.root(pid)
+        entry = index.get(root)
+        if entry is None:
+            return None
+        cpu = 0.0
+        rss = 0
+        count = 0
+        measured = 0
+        sampled = set()
+        for p in index.tree(root):
+            e = index.procs.get(p)
+            if e is None:
+                continue
+            try:
+                # the Process objects live in the index, so cpu_percent measures
+                # since the previous call for that process; a process that was
+                # not in the last sample (focus just moved, new child) has a
+                # stale or no baseline and only gets primed this time
+                pct = e[0].cpu_percent(None)
+                rss += e[0].memory_info().rss
+                count += 1
+            except (ps.NoSuchProcess, ps.AccessDenied, ps.ZombieProcess):
+                continue
+            sampled.add(p)
+            if p in self._sampled:
+                cpu += pct
+                measured += 1
+        self._sampled = sampled
+        return entry[2], count, cpu / self.ncpu if measured else None, rss
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1000:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+# Battery drain estimator
+# Least-squares line through the last BATTERY_WINDOW (time, percent) samples.
+# The sums the fit needs are updated as a sample enters and leaves the ring,
+# so each new sample is O(1). Plugging in or out starts a new fit.
+BATTERY_WINDOW = 60          # samples, 5 min at the default 5 s refresh
+BATTERY_MIN_SPAN = 60.0      # seconds of data before an estimate is shown
+
+class BatteryEstimator:
+    def __init__(self, window=BATTERY_WINDOW, min_span=BATTERY_MIN_SPAN):
+        self.window = window
+        self.min_span = min_span
+        self._xs = [0.0] * window
+        self._ys = [0.0] * window
+        self.plugged = None
+        self.reset()
+
+    def reset(self):
+        self._pos = 0
+        self._count = 0
+        self._origin = None
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def add(self, t, percent, plugged):
+        if plugged != self.plugged:
+            self.plugged = plugged
+            self.reset()
+        if self._origin is None:
+            self._origin = t
+        x = t - self._origin          # small numbers keep the sums precise
+        y = float(percent)
+        if self._count == self.window:
+            ox, oy = self._xs[self._pos], self._ys[self._pos]
+            self._sx -= ox
+            self._sy -= oy
+            self._sxx -= ox * ox
+            self._sxy -= ox * oy
         else:
-            _smoothed_level = (
-                _smoothed_level * (1 - MIC_RELEASE)
-                + target * MIC_RELEASE
-            )
+            self._count += 1
+        self._xs[self._pos] = x
+        self._ys[self._pos] = y
+        self._pos = (self._pos + 1) % self.window
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+
+    def span(self):
+        if self._count < 2:
+            return 0.0
+        newest = self._xs[(self._pos - 1) % self.window]
+        oldest = self._xs[self._pos if self._count == self.window else 0]
+        return newest - oldest
+
+    def slope(self):
+        # percent per second, None until there is enough data
+        n = self._count
+        if n < 3 or self.span() < self.min_span:
+            return None
+        den = n * self._sxx - self._sx * self._sx
+        if den <= 0.0:
+            return None
+        return (n * self._sxy - self._sx * self._sy) / den
+
+    def estimate(self, percent):
+        # (percent per hour, seconds to empty or full or None)
+        slope = self.slope()
+        if slope is None:
+            return None, None
+        rate = slope * 3600.0
+        if self.plugged and slope > 0:
+            return rate, (100.0 - percent) / slope
+        if not self.plugged and slope < 0:
+            return rate, percent / -slope
+        return rate, None
+
+def battery_capacity_wh():
+    # full-charge capacity from WMI, so the drain can be shown in watts
+    try:
+        import win32com.client
+        wmi = win32com.client.GetObject(r"winmgmts:\\.\root\wmi")
+        total = sum(int(b.FullChargedCapacity) for b in wmi.InstancesOf("BatteryFullChargedCapacity"))
+        return total / 1000.0 if total > 0 else None
+    except Exception:
+        return None
 
-        percent = int(_smoothed_level * 100)
-        bars = int(_smoothed_level * 10)
+def format_duration(seconds):
+    minutes = int(seconds // 60)
+    if minutes >= 60:
+        return f"{minutes // 60}h{minutes % 60:02d}"
+    return f"{minutes}m"
+
+# Thermal sensors
+# Sensors are discovered once and classified as CPU / GPU / fan; after that a
+# pass only reads the chosen ones. The source's signature (hwmon directory
+# listing, WMI hardware list) is checked every THERMAL_RESCAN seconds and a
+# change triggers a new discovery. A sensor that stops reading is dropped so
+# the others keep showing, and rediscovery for it runs at most once per
+# THERMAL_RESCAN.
+THERMAL_HWMON_ROOT = "/sys/class/hwmon"
+THERMAL_CPU_CHIPS = ("coretemp", "k10temp", "zenpower", "cpu_thermal", "soc_thermal", "acpitz")
+THERMAL_GPU_CHIPS = ("amdgpu", "radeon", "nouveau", "i915", "xe")
+THERMAL_RESCAN = 30.0
+
+def _thermal_group(chip, cpu_chips=THERMAL_CPU_CHIPS, gpu_chips=THERMAL_GPU_CHIPS):
+    chip = chip.lower()
+    if any(chip.startswith(c) for c in cpu_chips):
+        return "cpu"
+    if any(chip.startswith(c) for c in gpu_chips):
+        return "gpu"
+    return None
 
-        return bars, percent
+class HwmonSensors:
+    # Linux sysfs; every chosen *_input file stays open and is re-read with pread
+    def __init__(self, root=THERMAL_HWMON_ROOT):
+        self.root = root
+        self.sensors = []        # [group, label, fd, scale]
+        self.dropped = 0
 
-    except Exception:
-        return 0, 0
+    def signature(self):
+        try:
+            return tuple(sorted(os.listdir(self.root)))
+        except OSError:
+            return None
+
+    def discover(self):
+        self.close()
+        found = []
+        for entry in self.signature() or ():
+            path = os.path.join(self.root, entry)
+            try:
+                with open(os.path.join(path, "name")) as f:
+                    chip = f.read().strip()
+                files = sorted(os.listdir(path))
+            except OSError:
+                continue
+            group = _thermal_group(chip)
+            for fn in files:
+                prefix, _, suffix = fn.partition("_")
+                if suffix != "input":
+                    continue
+                if prefix.startswith("fan"):
+                    sensor_group, scale = "fan", 1.0
+                elif prefix.startswith("temp") and group is not None:
+                    sensor_group, scale = group, 0.001
+                else:
+                    continue
+                label = prefix
+                try:
+                    with open(os.path.join(path, prefix + "_label")) as f:
+                        label = f.read().strip()
+                except OSError:
+                    pass
+                try:
+                    fd = os.open(os.path.join(path, fn), os.O_RDONLY)
+                except OSError:
+                    continue
+                found.append([sensor_group, f"{chip}/{label}", fd, scale])
+        # keep the ACPI zone only when there is no real CPU sensor
+        if any(s[0] == "cpu" and not s[1].startswith("acpitz") for s in found):
+            for s in [s for s in found if s[1].startswith("acpitz")]:
+                os.close(s[2])
+                found.remove(s)
+        self.sensors = found
+        self.dropped = 0
+
+    def read(self):
+        values = []
+        for s in list(self.sensors):
+            group, label, fd, scale = s
+            try:
+                values.append((group, int(os.pread(fd, 32, 0)) * scale))
+            except (OSError, ValueError):
+                # device unplugged / driver reloaded
+                os.close(fd)
+                self.sensors.remove(s)
+                self.dropped += 1
+        return values
+
+    def close(self):
+        for s in self.sensors:
+            try:
+                os.close(s[2])
+            except OSError:
+                pass
+        self.sensors = []
 
-# Worker thread: collects sensors and spotify
-def stats_worker_loop(spotify_interval=1.0):
-    global _worker_stop
+class WmiSensors:
+    # Windows has no sensor API psutil can use; LibreHardwareMonitor /
+    # OpenHardwareMonitor publish theirs over WMI when running
+    NAMESPACES = (r"root\LibreHardwareMonitor", r"root\OpenHardwareMonitor")
+    CPU_IDS = ("/intelcpu", "/amdcpu")
+    GPU_IDS = ("/gpu", "/nvidiagpu", "/atigpu")
+
+    def __init__(self):
+        self.wmi = None
+        self.sensors = []
+        self._query = None
+        self._groups = {}
+        self.dropped = 0
+
+    def _connect(self):
+        import win32com.client
+        for ns in self.NAMESPACES:
+            try:
+                return win32com.client.GetObject("winmgmts:\\\\.\\" + ns)
+            except Exception:
+                continue
+        return None
+
+    def signature(self):
+        if self.wmi is None:
+            self.wmi = self._connect()
+            if self.wmi is None:
+                return None
+        try:
+            return tuple(sorted(h.Identifier for h in self.wmi.ExecQuery("SELECT Identifier FROM Hardware")))
+        except Exception:
+            self.wmi = None
+            return None
+
+    def discover(self):
+        self.sensors = []
+        self._query = None
+        self.dropped = 0
+        if self.wmi is None:
+            self.wmi = self._connect()
+            if self.wmi is None:
+                return
+        found = {}
+        for s in self.wmi.ExecQuery("SELECT Identifier, Name, SensorType FROM Sensor "
+                                    "WHERE SensorType='Temperature' OR SensorType='Fan'"):
+            ident = s.Identifier
+            if s.SensorType == "Fan":
+                group = "fan"
+            elif ident.startswith(self.CPU_IDS):
+                group = "cpu"
+            elif ident.startswith(self.GPU_IDS):
+                group = "gpu"
+            else:
+                continue
+            found[ident] = group
+            self.sensors.append([group, s.Name, ident, 1.0])
+        self._groups = found
+        self._build_query()
+
+    def _build_query(self):
+        # one prebuilt query that reads only the chosen sensors
+        self._query = None
+        if self._groups:
+            where = " OR ".join(f"Identifier='{i}'" for i in self._groups)
+            self._query = f"SELECT Identifier, Value FROM Sensor WHERE {where}"
+
+    def read(self):
+        if self._query is None:
+            return []
+        values = []
+        bad = set(self._groups)
+        for s in self.wmi.ExecQuery(self._query):
+            try:
+                values.append((self._groups[s.Identifier], float(s.Value)))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+            bad.discard(s.Identifier)
+        if bad:
+            # sensors that vanished or report no value
+            for ident in bad:
+                del self._groups[ident]
+            self.sensors = [s for s in self.sensors if s[2] not in bad]
+            self.dropped += len(bad)
+            self._build_query()
+        return values
+
+    def close(self):
+        self.sensors = []
+
+class PsutilSensors:
+    # any other platform psutil supports; it re-reads everything, so only
+    # the chosen (group, chip, index) entries are kept out of each call
+    def __init__(self):
+        self.sensors = []
+        self.dropped = 0
+
+    def signature(self):
+        return None
+
+    def discover(self):
+        self.sensors = []
+        self.dropped = 0
+        temps = getattr(psutil, "sensors_temperatures", lambda: {})() or {}
+        for chip, entries in temps.items():
+            group = _thermal_group(chip)
+            if group is not None:
+                self.sensors += [[group, f"{chip}/{e.label or i}", ("t", chip, i), 1.0] for i, e in enumerate(entries)]
+        fans = getattr(psutil, "sensors_fans", lambda: {})() or {}
+        for chip, entries in fans.items():
+            self.sensors += [["fan", f"{chip}/{e.label or i}", ("f", chip, i), 1.0] for i, e in enumerate(entries)]
+
+    def read(self):
+        if not self.sensors:
+            return []
+        temps = psutil.sensors_temperatures() if any(s[2][0] == "t" for s in self.sensors) else {}
+        fans = psutil.sensors_fans() if any(s[2][0] == "f" for s in self.sensors) else {}
+        values = []
+        for s in list(self.sensors):
+            group, label, (kind, chip, i), scale = s
+            try:
+                values.append((group, float((temps if kind == "t" else fans)[chip][i].current)))
+            except (KeyError, IndexError, TypeError, ValueError):
+                self.sensors.remove(s)
+                self.dropped += 1
+        return values
+
+    def close(self):
+        self.sensors = []
+
+class ThermalMonitor:
+    def __init__(self, source, rescan=THERMAL_RESCAN):
+        self.source = source
+        self.rescan = rescan
+        self.discoveries = 0
+        self._sig = source.signature()
+        self._discover()
+        self._next_check = time.monotonic() + rescan
+        self._next_discover = 0.0
+
+    def _discover(self):
+        self.source.discover()
+        self.discoveries += 1
+
+    def read(self, now=None):
+        # {"cpu": hottest °C, "gpu": hottest °C, "fan": fastest rpm}, groups
+        # without a sensor are left out
+        now = time.monotonic() if now is None else now
+        if now >= self._next_check:
+            self._next_check = now + self.rescan
+            sig = self.source.signature()
+            if sig != self._sig:
+                self._sig = sig
+                self._discover()
+        try:
+            values = self.source.read()
+            failed = self.source.dropped > 0
+        except Exception:
+            # the whole source failed (WMI provider stopped, sysfs gone)
+            values = []
+            failed = True
+        if failed and now >= self._next_discover:
+            self._next_discover = now + self.rescan
+            self._discover()
+        result = {}
+        for group, value in values:
+            if value > result.get(group, float("-inf")):
+                result[group] = value
+        return result
+
+    def close(self):
+        self.source.close()
+
+# Clock / Date
+# Formats are compiled once into a list of small getters, and the clock thread
+# only re-renders on minute (or second) and day boundaries.
+CLOCK_FORMATS = {
+    "12h": "%I:%M %p",
+    "24h": "%H:%M",
+    "12h_seconds": "%I:%M:%S %p",
+    "24h_seconds": "%H:%M:%S",
+    "iso": "%Y-%m-%dT%H:%M",
+}
+DATE_FORMATS = {
+    "dmy": "%d/%m/%Y",
+    "mdy": "%m/%d/%Y",
+    "iso": "%Y-%m-%d",
+}
+CLOCK_FORMAT = "12h"
+DATE_FORMAT = "dmy"
+TZ_CHECK_S = 60.0
+_tz_info = None
+
+def refresh_timezone():
+    # the C library reads the timezone once at startup; re-read it so a zone or
+    # DST-rule change made while we run shows up without a restart
+    global _tz_info
+    if hasattr(time, "tzset"):
+        time.tzset()
+        return
+    if sys.platform != "win32":
+        return
     try:
-        pythoncom.CoInitialize()
-    except Exception:
+        # DYNAMIC_TIME_ZONE_INFORMATION is 432 bytes, only compared as a whole
+        buf = ctypes.create_string_buffer(432)
+        ctypes.windll.kernel32.GetDynamicTimeZoneInformation(buf)
+        if _tz_info is not None and buf.raw != _tz_info:
+            ctypes.cdll.ucrtbase._tzset()
+        _tz_info = buf.raw
+    except (AttributeError, OSError):
         pass
 
-    psutil.cpu_percent(interval=None) 
-    last_spotify = 0.0
-    spotify_cache = {"text": "Spotify: —", "ts": 0.0}
-    SPOTIFY_TTL = 3.0
+_PAD2 = [f"{i:02}" for i in range(100)]
+_AMPM = (time.strftime("%p", (2000, 1, 1, 9, 0, 0, 5, 1, -1)) or "AM",
+         time.strftime("%p", (2000, 1, 1, 21, 0, 0, 5, 1, -1)) or "PM")
+_CLOCK_DIRECTIVES = {
+    "H": lambda t: _PAD2[t.tm_hour],
+    "I": lambda t: _PAD2[t.tm_hour % 12 or 12],
+    "M": lambda t: _PAD2[t.tm_min],
+    "S": lambda t: _PAD2[min(t.tm_sec, 59)],
+    "p": lambda t: _AMPM[t.tm_hour >= 12],
+    "d": lambda t: _PAD2[t.tm_mday],
+    "m": lambda t: _PAD2[t.tm_mon],
+    "y": lambda t: _PAD2[t.tm_year % 100],
+    "Y": lambda t: str(t.tm_year),
+    "%": lambda t: "%",
+}
 
+def compile_time_format(fmt):
+    parts = []
+    literal = ""
+    i = 0
+    while i < len(fmt):
+        ch = fmt[i]
+        if ch == "%" and i + 1 < len(fmt):
+            d = fmt[i + 1]
+            if literal:
+                parts.append(lambda t, s=literal: s)
+                literal = ""
+            # anything we don't precompile falls back to strftime for that directive
+            parts.append(_CLOCK_DIRECTIVES.get(d) or (lambda t, s="%" + d: time.strftime(s, t)))
+            i += 2
+        else:
+            literal += ch
+            i += 1
+    if literal:
+        parts.append(lambda t, s=literal: s)
+    uses_seconds = "%S" in fmt or "%T" in fmt or "%X" in fmt
+    return parts, uses_seconds
+
+def render_time_format(compiled, t):
+    return "".join([f(t) for f in compiled])
+
+class ClockScheduler:
+    def __init__(self, time_fmt=None, date_fmt=None):
+        self.wake = threading.Event()
+        self.set_formats(time_fmt or CLOCK_FORMATS[CLOCK_FORMAT],
+                         date_fmt or DATE_FORMATS[DATE_FORMAT])
+
+    def set_formats(self, time_fmt, date_fmt):
+        self._time_parts, seconds = compile_time_format(time_fmt)
+        self._date_parts, _ = compile_time_format(date_fmt)
+        self.period = 1 if seconds else 60
+        self._next_tick = 0.0
+        self._next_day = 0.0
+        self._next_tz = 0.0
+        self._offset = None
+        self.time_text = "Time: --:--"
+        self.date_text = "Date: --/--/----"
+        self.wake.set()
+
+    def _next_midnight(self, t):
+        # mktime with isdst=-1 lets the C library resolve DST for the new day
+        return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+    def tick(self, now=None):
+        # returns True when the rendered strings changed
+        now = time.time() if now is None else now
+        if self._next_tick - self.period - 1 <= now < self._next_tick:
+            return False
+        if now >= self._next_tz or now < self._next_tz - TZ_CHECK_S:
+            self._next_tz = now + TZ_CHECK_S
+            refresh_timezone()
+        t = time.localtime(now)
+        offset = t.tm_gmtoff
+        if offset != self._offset or now >= self._next_day or now < self._next_tick - self.period - 1:
+            # new day, DST/timezone change or the wall clock jumped
+            self._offset = offset
+            self._next_day = self._next_midnight(t)
+            self.date_text = "Date: " + render_time_format(self._date_parts, t)
+        local = now + offset
+        self._next_tick = (local // self.period + 1) * self.period - offset
+        self.time_text = "Time: " + render_time_format(self._time_parts, t)
+        return True
+
+    def seconds_until_tick(self, now=None):
+        now = time.time() if now is None else now
+        return max(0.0, self._next_tick - now)
+
+clock = ClockScheduler()
+
+def clock_worker_loop():
     while not _worker_stop:
-        try:
-            # Battery
-            try:
-                battery = psutil.sensors_battery()
-                batt_text = f"Battery: {battery.percent}%" if battery else "Battery: --%"
-            except Exception:
-                batt_text = "Battery: --%"
+        clock.wake.clear()
+        if clock.tick():
+            with stats_lock:
+                stats["date"] = clock.date_text
+                stats["time"] = clock.time_text
+        # Event.wait can return a few ms early on Windows, tick() simply waits again;
+        # the cap keeps us honest if the wall clock is moved while we sleep
+        clock.wake.wait(min(clock.seconds_until_tick() + 0.002, clock.period))
+
+# Alerts
+# Rules run against the numeric values the probes publish (cpu_pct, ram_pct,
+# battery_pct, <mic>_percent, app_name). Each sample is O(1): "for" rules keep
+# the time the condition started, "avg" rules keep a ring buffer and running sum.
+ALERT_FLASH_HZ = 2.0
+CALL_APPS = ["teams.exe", "ms-teams.exe", "zoom.exe", "discord.exe", "slack.exe", "skype.exe"]
+DEFAULT_ALERTS = [
+    {"name": "cpu_hot", "metric": "cpu_pct", "op": ">", "value": 90, "for": 10, "widget": "cpu"},
+    {"name": "ram_full", "metric": "ram_pct", "op": ">", "value": 95, "widget": "ram"},
+    {"name": "battery_low", "metric": "battery_pct", "op": "<", "value": 15, "widget": "battery"},
+    {"name": "disk_full", "metric": "space_free_min_pct", "op": "<", "value": 5, "widget": "space"},
+    {"name": "mic_silent", "metric": "mic_percent", "op": "<", "value": 2, "for": 60,
+     "apps": CALL_APPS, "widget": "mic"},
+]
+ALERT_COLOR = "#ff3030"
 
-            # RAM
+_ALERT_OPS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+class AlertRule:
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.metric = spec["metric"]
+        self.test = _ALERT_OPS[spec.get("op", ">")]
+        self.value = float(spec["value"])
+        self.hold = float(spec.get("for", 0.0))
+        self.apps = {a.lower() for a in spec.get("apps", ())}
+        self.widget = spec.get("widget")
+        self.color = spec.get("color", ALERT_COLOR)
+        avg = int(spec.get("avg", 0))   # rolling mean over the last N samples
+        self._ring = [0.0] * avg
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self.since = None
+        self.active = False
+
+    def update(self, value, now, app):
+        if self._ring:
+            self._sum += value - self._ring[self._pos]
+            self._ring[self._pos] = value
+            self._pos = (self._pos + 1) % len(self._ring)
+            self._count = min(self._count + 1, len(self._ring))
+            value = self._sum / self._count
+        ok = self.test(value, self.value) and (not self.apps or app in self.apps)
+        if not ok:
+            self.since = None
+        elif self.since is None:
+            self.since = now
+        active = ok and now - self.since >= self.hold
+        changed = active != self.active
+        self.active = active
+        return changed
+
+class AlertEngine:
+    def __init__(self, specs):
+        self.rules = []
+        self.by_metric = {}
+        for spec in specs:
             try:
-                ram_text = f"RAM: {psutil.virtual_memory().percent}%"
+                rule = AlertRule(spec)
             except Exception:
-                ram_text = "RAM: --%"
+                print(f"config: bad alert rule {spec!r} ignored")
+                continue
+            self.rules.append(rule)
+            self.by_metric.setdefault(rule.metric, []).append(rule)
+        self.app = ""
+        self.state = ()
+
+    def feed(self, out, now):
+        # returns True when the set of active alerts changed
+        if "app_name" in out:
+            self.app = out["app_name"].lower()
+        changed = False
+        for metric, rules in self.by_metric.items():
+            value = out.get(metric)
+            if value is None:
+                continue
+            for rule in rules:
+                if rule.update(value, now, self.app):
+                    changed = True
+        if changed:
+            self.state = tuple((r.name, r.color, r.widget) for r in self.rules if r.active)
+        return changed
+
+# Tracing
+# Optional timeline of probe calls, update_overlay calls and repaints, written
+# as Chrome Trace Event JSON (open it in ui.perfetto.dev). Spans go into
+# preallocated arrays used as a ring; with tracing off each span site is one
+# `_tracer is not None` check.
+TRACE_CAPACITY = 1 << 18
+TRACE_PATH = "UsefulOverlay.trace.json"
+
+class Tracer:
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.capacity = capacity
+        self._start = np.zeros(capacity, np.int64)
+        self._dur = np.zeros(capacity, np.int64)
+        self._name = np.zeros(capacity, np.int32)
+        self._tid = np.zeros(capacity, np.int32)
+        self._names = {}
+        self._threads = {}
+        self._count = itertools.count()     # next() is atomic, safe across threads
+        self.total = 0
+
+    def _id(self, table, key, value):
+        i = table.get(key)
+        if i is None:
+            i = table.setdefault(key, (len(table), value))
+        return i[0]
+
+    def add(self, name, t0, t1=None):
+        # t0 / t1 from time.perf_counter_ns()
+        if t1 is None:
+            t1 = time.perf_counter_ns()
+        i = next(self._count)
+        j = i % self.capacity
+        self._start[j] = t0
+        self._dur[j] = t1 - t0
+        self._name[j] = self._id(self._names, name, name)
+        th = threading.current_thread()
+        self._tid[j] = self._id(self._threads, th.ident, th.name)
+        self.total = i + 1
+
+    def export(self, path, process_name="UsefulOverlay"):
+        n = min(self.total, self.capacity)
+        order = np.argsort(self._start[:n], kind="stable")
+        names = [None] * len(self._names)
+        for name, (i, _) in self._names.items():
+            names[i] = name
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": process_name}}]
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": tname}}
+                   for tid, tname in self._threads.values()]
+        start = self._start[order] // 1000
+        dur = self._dur[order] // 1000
+        name_ids = self._name[order]
+        tids = self._tid[order]
+        for k in range(n):
+            events.append({"name": names[name_ids[k]], "ph": "X", "ts": int(start[k]), "dur": int(dur[k]),
+                           "pid": pid, "tid": int(tids[k])})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        dropped = self.total - n
+        print(f"trace: {n} spans written to {path}" + (f" ({dropped} oldest overwritten)" if dropped else ""))
+
+_tracer = None
+_trace_suffix = ""       # ".collector" in the collector child, it writes its own file
+
+def export_trace():
+    if _tracer is None:
+        return
+    path = (config.get("trace") or {}).get("path", TRACE_PATH)
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(CONFIG_PATH), path)
+    if _trace_suffix:
+        root, ext = os.path.splitext(path)
+        path = root + _trace_suffix + ext
+    try:
+        _tracer.export(path, "UsefulOverlay" + _trace_suffix)
+    except Exception:
+        traceback.print_exc()
+
+# Config
+# UsefulOverlay.json next to the script / exe. Anything missing falls back to
+# the defaults below. The overlay polls the file's mtime and applies edits live.
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "UsefulOverlay.json")
+CONFIG_POLL_MS = 1000
+
+# per-widget options, "refresh" is the probe interval in seconds
+WIDGET_DEFAULTS = {
+    "battery": {"refresh": 5.0, "window": BATTERY_WINDOW, "capacity_wh": None},
+    "ram": {"refresh": 1.0},
+    "gpu": {"refresh": 1.0},
+    "thermal": {"refresh": 2.0, "hwmon_root": THERMAL_HWMON_ROOT},
+    "space": {"refresh": 1.0, "volumes": None, "interval": SPACE_INTERVAL, "timeout": SPACE_TIMEOUT},
+    "hosts": {"refresh": 1.0, "listen": f"0.0.0.0:{DEFAULT_PORT}", "stale": STALE_S},
+    "cpu": {"refresh": 0.2},
+    "cpu_heatmap": {"cells": CPU_HEATMAP_CELLS, "cell_width": CPU_HEATMAP_CELL_W},
+    "net": {"refresh": IO_INTERVAL, "per_device": NET_PER_INTERFACE, "devices": NET_INTERFACES},
+    "disk": {"refresh": IO_INTERVAL, "per_device": DISK_PER_DEVICE, "devices": DISK_DEVICES},
+    "app": {"refresh": 0.25, "tree": True, "usage": True},
+    "date": {"format": DATE_FORMAT},
+    "time": {"format": CLOCK_FORMAT},
+    "timer": {},
+    "spectrum": {"bands": SPECTRUM_BANDS, "window": SPECTRUM_WINDOW, "fmin": SPECTRUM_FMIN,
+                 "db_floor": SPECTRUM_DB_FLOOR, "db_ceiling": SPECTRUM_DB_CEILING, "bar_width": 3},
+    "art": {"cache_mb": ART_CACHE_MB},
+    "progress": {"width": 80},
+    "jitter": {},
+    "mic": {"refresh": 0.05, "label": "Mic", "device": None, "loopback": False,
+            "auto_gain": True, "noise_floor": MIC_NOISE_FLOOR, "attack_ms": MIC_ATTACK_MS, "release_ms": MIC_RELEASE_MS,
+            "peak_hold_ms": MIC_PEAK_HOLD_MS, "peak_fall": MIC_PEAK_FALL,
+            "clip_level": MIC_CLIP_LEVEL, "clip_hold_ms": MIC_CLIP_HOLD_MS},
+    "spotify": {"refresh": 1.0, "ttl": SPOTIFY_TTL, "marquee": True, "width": 260,
+                "speed": 30.0, "fps": 30},
+}
+DEFAULT_CONFIG = {
+    "widgets": ["battery", "ram", "gpu", "thermal", "cpu", "cpu_heatmap", "net", "disk", "space", "app",
+                "date", "time", "timer", "mic", "art", "spotify", "progress"],
+    "colors": list(COLOR_CYCLE),
+    "height": 26,
+    "spacing": 90,
+    "font_size": 12,
+    "ui_interval_ms": 200,
+    "worker_sleep": 0.05,
+    "collector": "thread",   # or "process" (read at startup)
+    "alerts": DEFAULT_ALERTS,
+    # latest numeric snapshot for other processes, see overlay_reader.py
+    "shared_memory": {"enabled": True, "name": SHM_NAME},
+    # timeline of probe calls / UI updates / repaints, written on exit
+    "trace": {"enabled": False, "path": TRACE_PATH, "capacity": TRACE_CAPACITY},
+    # last values shown at launch until the probes catch up (read at startup)
+    "warm_cache": True,
+    # push this machine's stats to an aggregator's "hosts" widget, e.g. "10.0.0.5:48650"
+    "push": {"to": None, "name": None},
+}
+
+# widgets that can appear more than once as "kind:name", e.g. "mic:desk"
+MULTI_INSTANCE_WIDGETS = ("mic",)
+
+config = None
+_config_generation = 0
+_publish_hook = None     # set in the collector child process
+_art_executor = None
+
+def _coerce(value, default, where):
+    # option value converted to the type of its default, ValueError if it can't be
+    if default is None or value is None:
+        return value
+    try:
+        if isinstance(default, bool):
+            if isinstance(value, bool) or value in (0, 1):
+                return bool(value)
+            raise ValueError(value)
+        if isinstance(default, int):
+            return int(value)
+        if isinstance(default, float):
+            return float(value)
+        if isinstance(default, str):
+            if not isinstance(value, str):
+                raise ValueError(value)
+            return value
+        if isinstance(default, (list, dict)) and not isinstance(value, type(default)):
+            raise ValueError(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"config: {where} = {value!r} is not a valid {type(default).__name__}") from None
+    return value
+
+# options that default to None (auto / all) and what they may be set to instead
+_OPTIONAL_TYPES = {
+    "capacity_wh": "number",
+    "volumes": "list of names",
+    "devices": "list of names",
+    "device": "index or name",
+}
+
+def _coerce_optional(value, key, where):
+    if value is None:
+        return value
+    kind = _OPTIONAL_TYPES.get(key)
+    if kind == "number" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if kind == "list of names" and isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    if kind == "index or name" and isinstance(value, (int, str)) and not isinstance(value, bool):
+        return value
+    if kind is None and isinstance(value, str):
+        return value
+    raise ValueError(f"config: {where} = {value!r} is not a valid {kind or 'str'}")
+
+def load_config(path=CONFIG_PATH):
+    # everything is checked and converted here, so applying the result can't fail
+    user = {}
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                user = json.load(f)
+        except FileNotFoundError:
+            pass
+    cfg = dict(DEFAULT_CONFIG)
+    cfg.update(user)
+    for key, default in DEFAULT_CONFIG.items():
+        if key != "widgets":
+            cfg[key] = _coerce(cfg[key], default, key)
+    # widgets: ordered name -> options, entries are "name" or {"name": ..., options}
+    widgets = {}
+    for entry in cfg["widgets"]:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        name = entry.get("name")
+        kind, _, suffix = str(name).partition(":")
+        if kind not in WIDGET_DEFAULTS or (suffix and kind not in MULTI_INSTANCE_WIDGETS):
+            print(f"config: unknown widget {name!r} ignored")
+            continue
+        opts = dict(WIDGET_DEFAULTS[kind])
+        if suffix and "label" in opts:
+            opts["label"] = suffix.title()
+        opts.update(entry)
+        opts.pop("name", None)
+        for key, default in WIDGET_DEFAULTS[kind].items():
+            if default is None:
+                opts[key] = _coerce_optional(opts[key], key, f"{name}.{key}")
+            else:
+                opts[key] = _coerce(opts[key], default, f"{name}.{key}")
+        widgets[name] = opts
+    cfg["widgets"] = widgets
+    for key in ("to", "name"):
+        _coerce_optional(cfg["push"].get(key), key, f"push.{key}")
+    if cfg["push"].get("to"):
+        try:
+            parse_address(cfg["push"]["to"])
+        except ValueError:
+            raise ValueError(f"config: push.to = {cfg['push']['to']!r} is not a host:port address") from None
+    return cfg
+
+def apply_config(cfg):
+    global config, _config_generation, COLOR_CYCLE, color_index, current_color
+    global SPOTIFY_TTL, _tracer
+    widgets = cfg["widgets"]
+
+    COLOR_CYCLE = list(cfg["colors"]) or ["white"]
+    color_index %= len(COLOR_CYCLE)
+    current_color = COLOR_CYCLE[color_index]
+
+    if "spotify" in widgets:
+        SPOTIFY_TTL = float(widgets["spotify"]["ttl"])
+    if "time" in widgets or "date" in widgets:
+        t_fmt = widgets.get("time", WIDGET_DEFAULTS["time"])["format"]
+        d_fmt = widgets.get("date", WIDGET_DEFAULTS["date"])["format"]
+        clock.set_formats(CLOCK_FORMATS.get(t_fmt, t_fmt), DATE_FORMATS.get(d_fmt, d_fmt))
+
+    trace = cfg.get("trace") or {}
+    if trace.get("enabled") and _tracer is None:
+        _tracer = Tracer(int(trace.get("capacity", TRACE_CAPACITY)))
+    elif not trace.get("enabled") and _tracer is not None:
+        export_trace()
+        _tracer = None
+
+    config = cfg
+    _config_generation += 1
+
+def write_default_config(path=CONFIG_PATH):
+    out = dict(DEFAULT_CONFIG)
+    out["widgets"] = [dict({"name": n}, **WIDGET_DEFAULTS[n]) for n in DEFAULT_CONFIG["widgets"]]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"Wrote {path}")
+
+class ConfigWatcher:
+    # one os.stat per poll, editors that save via rename are caught too
+    def __init__(self, path):
+        self.path = path
+        self._sig = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def changed(self):
+        sig = self._stat()
+        if sig == self._sig:
+            return False
+        self._sig = sig
+        return True
+
+# Warm start
+# The last snapshot's plain values are saved on exit and every
+# WARM_CACHE_INTERVAL seconds and put into `stats` before the window shows,
+# so the first frame has real (if slightly old) values. probe_costs (factory +
+# first call, seconds) orders the next start's probes cheapest first.
+WARM_CACHE_PATH = os.path.join(os.path.dirname(CONFIG_PATH), "UsefulOverlay.cache.json")
+WARM_CACHE_INTERVAL = 60.0
+WARM_CACHE_MAX_AGE = 6 * 3600
+WARM_SKIP = ("time", "date", "art_stats")
+
+probe_costs = {}
+
+def save_warm_cache(path=WARM_CACHE_PATH):
+    with stats_lock:
+        values = {k: v for k, v in stats.items()
+                  if isinstance(v, (str, int, float)) and k not in WARM_SKIP}
+        costs = dict(stats.get("probe_costs") or probe_costs)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"saved": time.time(), "stats": values, "probe_costs": costs}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"warm cache: {e}")
+
+def load_warm_cache(path=WARM_CACHE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if time.time() - float(data["saved"]) > WARM_CACHE_MAX_AGE:
+            return 0
+        values = {k: v for k, v in data["stats"].items()
+                  if isinstance(v, (str, int, float)) and k not in WARM_SKIP}
+        costs = {k: float(v) for k, v in data.get("probe_costs", {}).items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return 0
+    probe_costs.update(costs)
+    with stats_lock:
+        stats.update(values)
+        stats["probe_costs"] = costs
+        if _startup is not None:
+            _startup.seen(values, False)
+    return len(values)
+
+def startup_keys(widgets):
+    # the stats keys a widget needs before its field means something
+    keys = set()
+    for name in widgets:
+        kind = name.partition(":")[0]
+        if kind == "mic":
+            keys.add(name + "_percent")
+        elif kind in stats and isinstance(stats[kind], str) and kind not in ("time", "date"):
+            keys.add(name)
+    return keys
+
+class StartupTimer:
+    # from process creation: first frame, first frame with every field filled
+    # (cached or live), first frame with every field live. seen() / frame()
+    # are called under stats_lock.
+    def __init__(self, keys):
+        self.pending_any = set(keys)
+        self.pending_live = set(keys)
+        self.created = ps.Process().create_time()
+        self.first = self.filled = self.live = None
+
+    def seen(self, keys, live):
+        self.pending_any.difference_update(keys)
+        if live:
+            self.pending_live.difference_update(keys)
+
+    def frame(self):
+        t = time.time() - self.created
+        if self.first is None:
+            self.first = t
+        if self.filled is None and not self.pending_any:
+            self.filled = t
+        if self.live is None and not self.pending_live:
+            self.live = t
+        return self.live is not None
+
+    def report(self):
+        def ms(t):
+            return "n/a" if t is None else f"{t * 1000:.0f} ms"
+        text = f"startup: first frame {ms(self.first)}, all fields filled {ms(self.filled)}, all live {ms(self.live)}"
+        if self.pending_live:
+            text += f" (still waiting for {', '.join(sorted(self.pending_live))})"
+        return text
+
+_startup = None
+
+# App usage
+# Focused time per app, accumulated in memory into (day, hour, app) buckets
+# and written to a local SQLite file in one transaction every
+# USAGE_FLUSH_INTERVAL seconds. Rows are per hour, so the file stays small,
+# and rows older than USAGE_KEEP_DAYS are pruned when it is opened.
+USAGE_DB_PATH = os.path.join(os.path.dirname(CONFIG_PATH), "UsefulOverlay.usage.sqlite")
+USAGE_FLUSH_INTERVAL = 60.0
+USAGE_MAX_PENDING = 512      # buckets held before an early flush
+USAGE_MAX_GAP = 5.0          # a longer gap between ticks (sleep, hang) isn't counted
+USAGE_IDLE_S = 300.0         # no input for this long counts as away
+USAGE_KEEP_DAYS = 90
+USAGE_SHOW_S = 8.0           # how long the hotkey summary replaces the app field
+
+def open_usage_db(path=USAGE_DB_PATH):
+    import sqlite3
+    db = sqlite3.connect(path, timeout=5.0)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS usage (day TEXT, hour INTEGER, app TEXT, seconds REAL, "
+               "PRIMARY KEY (day, hour, app)) WITHOUT ROWID")
+    return db
+
+class UsageTracker:
+    def __init__(self, path=USAGE_DB_PATH):
+        self.path = path
+        self.db = None
+        self.pending = {}        # (day, hour, app) -> seconds
+        self.flushes = 0
+        self._last = None
+        self._bucket = None
+        self._bucket_end = 0.0
+        self._next_flush = time.monotonic() + USAGE_FLUSH_INTERVAL
+
+    def _open(self):
+        self.db = open_usage_db(self.path)
+        cutoff = (datetime.date.today() - datetime.timedelta(days=USAGE_KEEP_DAYS)).isoformat()
+        with self.db:
+            self.db.execute("DELETE FROM usage WHERE day < ?", (cutoff,))
+
+    def tick(self, app, now=None):
+        # app is None when nothing counts (no window, idle); O(1) per call
+        now = time.monotonic() if now is None else now
+        last, self._last = self._last, now
+        if app and last is not None and now - last <= USAGE_MAX_GAP:
+            if now >= self._bucket_end:
+                t = datetime.datetime.now()
+                self._bucket = (t.date().isoformat(), t.hour)
+                self._bucket_end = now + 3600 - (t.minute * 60 + t.second + t.microsecond / 1e6)
+            key = self._bucket + (app,)
+            self.pending[key] = self.pending.get(key, 0.0) + (now - last)
+        if now >= self._next_flush or len(self.pending) >= USAGE_MAX_PENDING:
+            self.flush(now)
+
+    def flush(self, now=None):
+        self._next_flush = (time.monotonic() if now is None else now) + USAGE_FLUSH_INTERVAL
+        if not self.pending:
+            return
+        rows = [k + (v,) for k, v in self.pending.items()]
+        try:
+            if self.db is None:
+                self._open()
+            with self.db:
+                self.db.executemany(
+                    "INSERT INTO usage (day, hour, app, seconds) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (day, hour, app) DO UPDATE SET seconds = seconds + excluded.seconds", rows)
+        except Exception as e:
+            # keep the buckets for the next try, but don't grow without bound
+            print(f"usage: {e}")
+            if len(self.pending) < USAGE_MAX_PENDING * 4:
+                return
+        self.pending.clear()
+        self.flushes += 1
+
+    def close(self):
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+def usage_summary(days, path=USAGE_DB_PATH):
+    # [(app, seconds)] for the last `days` days including today, most used first
+    if not os.path.exists(path):
+        return []
+    since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    db = open_usage_db(path)
+    try:
+        return db.execute("SELECT app, SUM(seconds) FROM usage WHERE day >= ? GROUP BY app "
+                          "ORDER BY 2 DESC", (since,)).fetchall()
+    finally:
+        db.close()
+
+def usage_line(days=1, top=5):
+    rows = usage_summary(days)
+    label = "Today" if days == 1 else f"{days} days"
+    if not rows:
+        return f"{label}: no usage yet"
+    return f"{label}: " + "  ".join(f"{app} {format_duration(secs)}" for app, secs in rows[:top])
+
+def print_usage_report():
+    for days in (1, 7):
+        rows = usage_summary(days)
+        total = sum(s for _, s in rows)
+        print(f"{'Today' if days == 1 else 'Last 7 days'}: {format_duration(total)}")
+        for app, secs in rows[:15]:
+            print(f"  {format_duration(secs):>7}  {100.0 * secs / total:5.1f}%  {app}")
+
+# Probes
+# Each factory imports what it needs and returns probe(out), which writes its
+# stats keys into `out`. Factories only run for enabled widgets.
+def make_battery_probe(opts):
+    estimator = BatteryEstimator(int(opts["window"]))
+    global pythoncom
+    capacity = opts["capacity_wh"]
+    if capacity is None and sys.platform == "win32":
+        import pythoncom
+        try:
+            pythoncom.CoInitialize()
+        except Exception:
+            pass
+        capacity = battery_capacity_wh()
+    def probe(out):
+        try:
+            battery = psutil.sensors_battery()
+            if not battery:
+                out["battery"] = "Battery: --%"
+                return
+            out["battery_pct"] = battery.percent
+            estimator.add(time.monotonic(), battery.percent, bool(battery.power_plugged))
+            rate, secs = estimator.estimate(battery.percent)
+            text = f"Battery: {battery.percent:.0f}%"
+            if rate is not None:
+                out["battery_rate"] = rate
+                if capacity:
+                    text += f" {rate * capacity / 100.0:+.1f} W"
+                else:
+                    text += f" {rate:+.1f}%/h"
+                if secs is not None:
+                    text += f" {format_duration(secs)} {'to full' if estimator.plugged else 'left'}"
+            out["battery"] = text
+        except Exception:
+            out["battery"] = "Battery: --%"
+    return probe
+
+def make_ram_probe(opts):
+    def probe(out):
+        try:
+            ram_pct = psutil.virtual_memory().percent
+            out["ram"] = f"RAM: {ram_pct}%"
+            out["ram_pct"] = ram_pct
+        except Exception:
+            out["ram"] = "RAM: --%"
+    return probe
+
+def make_cpu_probe(opts):
+    sampler = PerCoreCpuSampler(opts.get("cells", CPU_HEATMAP_CELLS))
+    def probe(out):
+        try:
+            cpu_pct = sampler.sample()
+            out["cpu"] = f"CPU: {cpu_pct:.1f}%"
+            out["cpu_pct"] = cpu_pct
+            out["cpu_cells"] = sampler.cells
+            out["cpu_cost_us"] = sampler.cost_us
+        except Exception:
+            out["cpu"] = "CPU: --%"
+    return probe
+
+def make_gpu_probe(opts):
+    global GPUtil, gpu_available
+    try:
+        import GPUtil
+        gpu_available = True
+    except Exception:
+        gpu_available = False
+    def probe(out):
+        try:
+            gpus = GPUtil.getGPUs() if gpu_available else None
+            out["gpu"] = f"GPU: {gpus[0].load*100:.0f}%" if gpus else "GPU: N/A"
+            if gpus:
+                out["gpu_pct"] = gpus[0].load * 100
+        except Exception:
+            out["gpu"] = "GPU: N/A"
+    return probe
+
+def make_thermal_probe(opts):
+    global pythoncom
+    if sys.platform == "win32":
+        import pythoncom
+        try:
+            pythoncom.CoInitialize()    # WMI from the worker thread
+        except Exception:
+            pass
+        source = WmiSensors()
+    elif os.path.isdir(opts["hwmon_root"]):
+        source = HwmonSensors(opts["hwmon_root"])
+    else:
+        source = PsutilSensors()
+    monitor = ThermalMonitor(source)
+    gpu_fallback = None
+    if not any(s[0] == "gpu" for s in source.sensors):
+        try:
+            import GPUtil as gpu_fallback   # NVIDIA temperature via nvidia-smi
+        except Exception:
+            gpu_fallback = None
+    def probe(out):
+        try:
+            values = monitor.read()
+            if gpu_fallback is not None and "gpu" not in values:
+                temps = [g.temperature for g in gpu_fallback.getGPUs()]
+                if temps:
+                    values["gpu"] = max(temps)
+            parts = []
+            if "cpu" in values:
+                out["cpu_temp"] = values["cpu"]
+                parts.append(f"CPU {values['cpu']:.0f}°C")
+            if "gpu" in values:
+                out["gpu_temp"] = values["gpu"]
+                parts.append(f"GPU {values['gpu']:.0f}°C")
+            if "fan" in values:
+                out["fan_rpm"] = values["fan"]
+                parts.append(f"Fan {values['fan']:.0f} rpm")
+            out["thermal"] = "Temp: " + ("  ".join(parts) if parts else "N/A")
+        except Exception:
+            out["thermal"] = "Temp: N/A"
+    probe.close = monitor.close
+    return probe
+
+def make_hosts_probe(opts):
+    # aggregator side of multi-host mode, the agents are other overlays' "push"
+    agg = Aggregator(opts["listen"]).start()
+    def probe(out):
+        snap = agg.snapshot(float(opts["stale"]))
+        out["hosts"] = "Hosts: " + (format_hosts(snap) if snap else "waiting")
+        out["hosts_up"] = sum(1 for _, _, stale in snap if not stale)
+    probe.close = agg.stop
+    return probe
+
+def make_net_probe(opts):
+    meter = IoRateMeter(lambda: psutil.net_io_counters(pernic=True),
+                        ("bytes_recv", "bytes_sent"), opts["devices"], NET_EXCLUDE_PREFIXES)
+    def probe(out):
+        try:
+            meter.sample()
+            out["net"] = format_io_text(meter, "Net", ("↓", "↑"), opts["per_device"])
+            if len(meter.names):
+                out["net_rx_bps"], out["net_tx_bps"] = meter.total()
+        except Exception:
+            out["net"] = "Net: --"
+    return probe
+
+def make_disk_probe(opts):
+    meter = IoRateMeter(lambda: psutil.disk_io_counters(perdisk=True),
+                        ("read_bytes", "write_bytes"), opts["devices"],
+                        DISK_EXCLUDE_PREFIXES, keep=is_whole_disk)
+    def probe(out):
+        try:
+            meter.sample()
+            out["disk"] = format_io_text(meter, "Disk", ("R ", "W "), opts["per_device"])
+            if len(meter.names):
+                out["disk_read_bps"], out["disk_write_bps"] = meter.total()
+        except Exception:
+            out["disk"] = "Disk: --"
+    return probe
 
-            # CPU
+def make_space_probe(opts):
+    monitor = SpaceMonitor(opts["volumes"], float(opts["interval"]), float(opts["timeout"]))
+    def probe(out):
+        try:
+            monitor.poll()
+            rows = monitor.rows()
+            out["space"] = format_space(rows)
+            free = [100.0 - u.percent for _, u, _ in rows if u is not None]
+            if free:
+                out["space_free_min_pct"] = min(free)
+        except Exception:
+            out["space"] = "Space: --"
+    probe.close = monitor.close
+    return probe
+
+def make_app_probe(opts):
+    global win32gui, win32process
+    import win32gui, win32process
+    usage = AppTreeUsage() if opts["tree"] else None
+    tracker = UsageTracker() if opts["usage"] else None
+    try:
+        import win32api
+    except ImportError:
+        win32api = None
+
+    def idle_seconds():
+        if win32api is None:
+            return 0.0
+        return (win32api.GetTickCount() - win32api.GetLastInputInfo()) / 1000.0
+
+    def probe(out):
+        try:
+            hwnd = win32gui.GetForegroundWindow()
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            if usage is None:
+                out["app_name"] = ps.Process(pid).name()
+                out["app"] = f"App: {out['app_name']}"
+            else:
+                name, count, cpu, rss = usage.sample(pid)
+                out["app_name"] = name
+                out["app_rss"] = rss
+                procs = f" ×{count}" if count > 1 else ""
+                if cpu is None:
+                    pct = "--%"
+                else:
+                    out["app_cpu_pct"] = cpu
+                    pct = f"{cpu:.1f}%"
+                out["app"] = f"App: {name}{procs} {pct} {format_bytes(rss)}"
+        except Exception:
+            out["app"] = "App: —"
+            out["app_name"] = ""
+            out["app_cpu_pct"] = 0.0
+            out["app_rss"] = 0
+        if tracker is not None:
             try:
-                cpu_text = f"CPU: {psutil.cpu_percent(interval=0.05)}%"
+                tracker.tick(out["app_name"] if idle_seconds() < USAGE_IDLE_S else None)
             except Exception:
-                cpu_text = "CPU: --%"
-
-            # GPU
+                traceback.print_exc()
+    if tracker is not None:
+        probe.close = tracker.close
+    return probe
+
+def make_mic_probe(opts):
+    global sd
+    import sounddevice as sd
+    widgets = opts["_widgets"]
+    meters = []
+    for name, o in widgets.items():
+        if name.partition(":")[0] == "mic":
+            meters.append(AudioMeter(name, o, widgets.get("spectrum") if name == "mic" else None))
+    if "spectrum" in widgets and "mic" not in widgets:
+        meters.append(AudioMeter("mic", WIDGET_DEFAULTS["mic"], widgets["spectrum"]))
+    spectrum_meter = next((m for m in meters if m.spectrum_opts is not None), None)
+    engine = AudioEngine(meters)
+    engine.start()
+
+    def probe(out):
+        engine.poll()
+        for m in meters:
+            level, peak, clipping = m.read()
+            out[m.name + "_bars"] = int(level * 10)
+            out[m.name + "_percent"] = int(level * 100)
+            out[m.name + "_peak"] = min(9, int(peak * 10))
+            out[m.name + "_clip"] = clipping
+        if spectrum_meter is not None and spectrum_meter.spectrum is not None:
+            out["mic_spectrum"] = spectrum_meter.spectrum.levels
+            out["mic_spectrum_cost_us"] = spectrum_meter.spectrum.cost_us
+    probe.close = engine.stop
+    return probe
+
+def make_spotify_probe(opts):
+    global pythoncom, wmc, _art_executor
+    import pythoncom
+    import winsdk.windows.media.control as wmc
+    try:
+        pythoncom.CoInitialize()
+    except Exception:
+        pass
+    engine = MediaEngine()
+    cache = {"text": "Spotify: —", "ts": 0.0}
+    want_timeline = "progress" in config["widgets"]
+
+    art = None
+    if "art" in config["widgets"] and QImage is not None:
+        art_cache = AlbumArtCache(int(float(opts.get("cache_mb", ART_CACHE_MB)) * 1024 * 1024))
+        if _art_executor is None:
+            _art_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="album-art")
+        pending = set()
+        failed = set()           # keys whose thumbnail can't be read or decoded, not retried
+        current = {"key": None, "height": 0}
+        art = {"want": lambda k: (k, current["height"]) not in art_cache
+                                 and (k, current["height"]) not in pending
+                                 and (k, current["height"]) not in failed,
+               "failed": lambda k: failed.add((k, current["height"]))}
+
+        def decode_job(key, data):
             try:
-                if gpu_available:
-                    gpus = GPUtil.getGPUs()
-                    if gpus:
-                        g = gpus[0]
-                        gpu_text = f"GPU: {g.load*100:.0f}%"
-                    else:
-                        gpu_text = "GPU: N/A"
+                t0 = time.perf_counter()
+                img = decode_album_art(data, key[1])
+                art_cache.note_decode((time.perf_counter() - t0) * 1000.0)
+                if img is not None:
+                    art_cache.put(key, img)
+                    # picked up by the next probe call, so it also reaches an out-of-process GUI
+                    current["ready"] = (key, img)
                 else:
-                    gpu_text = "GPU: N/A"
+                    failed.add(key)
             except Exception:
-                gpu_text = "GPU: N/A"
+                failed.add(key)
+                traceback.print_exc()
+            finally:
+                pending.discard(key)
+
+    def probe(out):
+        if art is not None:
+            current["height"] = max(8, int(config["height"]) - 4)
+        try:
+            active = engine.poll(art)
+        except Exception:
+            active = None
+        sp = active.text if active is not None else None
+        if sp and sp.strip():
+            cache["text"] = sp
+            cache["ts"] = time.time()
+        elif time.time() - cache["ts"] > SPOTIFY_TTL:
+            cache["text"] = "Spotify: —"
+        out["spotify"] = cache["text"]
+        if want_timeline:
+            out["media_timeline"] = engine.timeline(active) if active is not None else None
+
+        if art is None:
+            return
+        ready = current.pop("ready", None)
+        if ready is not None and ready[0] == current["key"]:
+            out["art"] = ready
+            out["art_stats"] = art_cache.stats_text()
+        if sp and art.get("key") is not None:
+            key = (art["key"], current["height"])
+            if key != current["key"]:
+                current["key"] = key
+                img = art_cache.get(key)
+                out["art"] = (key, img) if img is not None else None
+                out["art_stats"] = art_cache.stats_text()
+            if key not in art_cache and art["data"] and key not in pending and key not in failed:
+                pending.add(key)
+                _art_executor.submit(decode_job, key, art["data"])
+        elif cache["text"] == "Spotify: —" and current["key"] is not None:
+            current["key"] = None
+            out["art"] = None
+    return probe
+
+# widget -> (probe key, factory); widgets sharing a key share one probe
+PROBES = {
+    "battery": ("battery", make_battery_probe),
+    "ram": ("ram", make_ram_probe),
+    "gpu": ("gpu", make_gpu_probe),
+    "thermal": ("thermal", make_thermal_probe),
+    "hosts": ("hosts", make_hosts_probe),
+    "space": ("space", make_space_probe),
+    "cpu": ("cpu", make_cpu_probe),
+    "cpu_heatmap": ("cpu", make_cpu_probe),
+    "net": ("net", make_net_probe),
+    "disk": ("disk", make_disk_probe),
+    "app": ("app", make_app_probe),
+    "mic": ("mic", make_mic_probe),
+    "spectrum": ("mic", make_mic_probe),
+    "art": ("spotify", make_spotify_probe),
+    "progress": ("spotify", make_spotify_probe),
+    "spotify": ("spotify", make_spotify_probe),
+}
+
+def _close_probe(entry):
+    # probes holding devices / threads / sockets expose close()
+    close = getattr(entry[0], "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            traceback.print_exc()
 
-            # Foreground app
+def build_probes(cfg, old, on_built=None):
+    # returns key -> [probe, interval, next_due, opts], reusing unchanged probes
+    # opts are merged per probe key, "_widgets" keeps each widget's own options
+    # new probes are built cheapest first (probe_costs) and handed to
+    # on_built(key, entry, build_seconds) as soon as each one exists
+    wanted = {}
+    for name, opts in cfg["widgets"].items():
+        kind = name.partition(":")[0]
+        if kind not in PROBES:
+            continue
+        key, factory = PROBES[kind]
+        merged = wanted.setdefault(key, [factory, {"_widgets": {}}])[1]
+        merged.update(opts)
+        merged["_widgets"][name] = opts
+    probes = {}
+    for key, (factory, opts) in sorted(wanted.items(), key=lambda kv: probe_costs.get(kv[0], 0.0)):
+        interval = float(opts.get("refresh", WIDGET_DEFAULTS[key]["refresh"]))
+        prev = old.pop(key, None)
+        if prev is not None and prev[3] == opts:
+            prev[1] = interval
+            probes[key] = prev
+            continue
+        if prev is not None:
+            # close the replaced probe first, its socket / device may be
+            # needed by the new one (e.g. the hosts aggregator's port)
+            _close_probe(prev)
+        t0 = time.perf_counter()
+        try:
+            probes[key] = [factory(opts), interval, 0.0, opts]
+        except ImportError as e:
+            print(f"{key}: disabled, {e}", file=sys.stderr)
+            continue
+        except Exception:
+            traceback.print_exc()
+            continue
+        if on_built is not None:
             try:
-                hwnd = win32gui.GetForegroundWindow()
-                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                proc = ps.Process(pid)
-                app_text = f"App: {proc.name()}"
+                on_built(key, probes[key], time.perf_counter() - t0)
             except Exception:
-                app_text = "App: —"
+                traceback.print_exc()
+    # probes of widgets that were removed
+    for prev in old.values():
+        _close_probe(prev)
+    return probes
+
+# Worker thread: runs each enabled probe at its own refresh interval
+def stats_worker_loop():
+    probes = {}
+    alerts = None
+    shm_writer = None
+    shm_name = None
+    agent = None
+    push = None
+    generation = -1
+    out = {}
+    last_sent = 0.0
+
+    def run_probe(key, p):
+        if _tracer is None:
+            p[0](out)
+        else:
+            t0 = time.perf_counter_ns()
+            p[0](out)
+            _tracer.add(key, t0)
 
-            # Date / Time
-            now = datetime.datetime.now()
-            date_text = f"Date: {now.day:02}/{now.month:02}/{now.year}"
-            time_text = f"Time: {now.strftime('%I:%M %p')}"
+    def publish(now):
+        nonlocal last_sent
+        if out:
+            with stats_lock:
+                stats.update(out)
+                if _startup is not None:
+                    _startup.seen(out, True)
+            if shm_writer is not None:
+                shm_writer.update(out)
+                shm_writer.publish()
+        if _publish_hook is not None and (out or now - last_sent >= COLLECTOR_HEARTBEAT_S):
+            _publish_hook(out)
+            last_sent = now
+        out.clear()
+
+    def first_sample(key, p, build_s):
+        # a new probe samples and publishes right away, so fast probes are on
+        # screen while slower factories are still starting
+        t0 = time.perf_counter()
+        run_probe(key, p)
+        probe_costs[key] = build_s + time.perf_counter() - t0
+        out["probe_costs"] = dict(probe_costs)
+        now = time.monotonic()
+        p[2] = now + p[1]
+        publish(now)
 
-            # Mic
-            mic_bars, mic_percent = get_mic_level_blocking()
+    while not _worker_stop:
+        try:
+            if generation != _config_generation:
+                generation = _config_generation
+                shm_cfg = config.get("shared_memory") or {}
+                want = shm_cfg.get("name", SHM_NAME) if shm_cfg.get("enabled") else None
+                if want != shm_name:
+                    if shm_writer is not None:
+                        shm_writer.close()
+                        shm_writer = None
+                    shm_name = want
+                    if want:
+                        try:
+                            shm_writer = SnapshotWriter(want)
+                        except FileExistsError as e:
+                            # another overlay (e.g. --i3bar next to the window) already publishes
+                            print(f"shared memory: {e}, not publishing", file=sys.stderr)
+                        except Exception:
+                            traceback.print_exc()
+                alerts = AlertEngine(config.get("alerts") or ())
+                out["alerts"] = ()
+                probes = build_probes(config, probes, first_sample)
+                push_cfg = config.get("push") or {}
+                want = (push_cfg.get("to"), push_cfg.get("name"))
+                if want != push:
+                    push = want
+                    if agent is not None:
+                        agent.close()
+                        agent = None
+                    if want[0]:
+                        # a bad push setting only turns pushing off
+                        try:
+                            agent = NetAgent(want[0], want[1])
+                        except Exception:
+                            traceback.print_exc()
+
+            now = time.monotonic()
+            next_due = now + 0.5
+            for key, p in probes.items():
+                if now >= p[2]:
+                    run_probe(key, p)
+                    p[2] = now + p[1]
+                next_due = min(next_due, p[2])
+
+            if alerts.feed(out, now):
+                out["alerts"] = alerts.state
+            if agent is not None:
+                agent.update(out, now)
+            publish(now)
 
-            # Spotify 
-            now_t = time.time()
-            sp = None
-            if now_t - last_spotify >= spotify_interval:
-                try:
-                    sp = spotify_now_playing()
-                except Exception as e:
-                    sp = None
-                last_spotify = now_t
-            else:
-                sp = None
-
-            # cache logic
-            spotify_to_write = spotify_cache["text"]
-            if sp and sp.strip():
-                spotify_cache["text"] = sp
-                spotify_cache["ts"] = time.time()
-                spotify_to_write = sp
-            else:
-                if time.time() - spotify_cache["ts"] > SPOTIFY_TTL:
-                    spotify_to_write = "Spotify: —"
+        except Exception:
+            traceback.print_exc()
+            next_due = 0.0
 
-            # write all stats
-            with stats_lock:
-                stats["battery"] = batt_text
-                stats["ram"] = ram_text
-                stats["gpu"] = gpu_text
-                stats["cpu"] = cpu_text
-                stats["app"] = app_text
-                stats["date"] = date_text
-                stats["time"] = time_text
-                stats["mic_bars"] = mic_bars
-                stats["mic_percent"] = mic_percent
-                stats["spotify"] = spotify_to_write
+        time.sleep(max(config["worker_sleep"], next_due - time.monotonic()))
 
+    build_probes({"widgets": {}}, probes)
+    if shm_writer is not None:
+        shm_writer.close()
+    if agent is not None:
+        agent.close()
+    if pythoncom is not None:
+        try:
+            pythoncom.CoUninitialize()
         except Exception:
-            traceback.print_exc()
+            pass
 
-        time.sleep(0.05)
+# Out-of-process collector
+# With "collector": "process" the worker loop runs in a child process and
+# streams each pass's output over a pipe; a reader thread in the GUI process
+# merges it into `stats`, so the UI code is the same in both modes. The GUI
+# restarts the child when it exits or stops sending (it heartbeats every second).
+COLLECTOR_HANG_S = 5.0
+COLLECTOR_HEARTBEAT_S = 1.0
+COLLECTOR_MAX_BACKOFF_S = 30.0
+# time a stopping worker gets to finish its pass (sleeps are at most 0.5 s) and
+# close its probes: usage flush, mic calibration, audio streams, shared memory
+WORKER_JOIN_S = 3.0
+
+def _pipe_encode(out):
+    # QImage doesn't pickle, ship album art as raw ARGB32 rows
+    art = out.get("art")
+    if art is None:
+        return out
+    key, img = art
+    ptr = img.constBits()
+    ptr.setsize(img.sizeInBytes() if hasattr(img, "sizeInBytes") else img.byteCount())
+    out = dict(out)
+    out["art"] = (key, img.width(), img.height(), img.bytesPerLine(), bytes(ptr))
+    return out
+
+def _pipe_decode(out):
+    art = out.get("art")
+    if art is not None:
+        key, w, h, bpl, data = art
+        out["art"] = (key, QImage(data, w, h, bpl, QImage.Format_ARGB32_Premultiplied).copy())
+    return out
+
+def _collector_cmd_loop(cmd_conn):
+    global _worker_stop
+    while True:
+        try:
+            cmd, arg = cmd_conn.recv()
+        except (EOFError, OSError):
+            break
+        if cmd == "config":
+            old = config
+            try:
+                apply_config(arg)
+            except Exception:
+                traceback.print_exc()
+                apply_config(old)
+        elif cmd == "stop":
+            break
+    _worker_stop = True
+
+def collector_main(cfg, data_conn, cmd_conn, costs=None):
+    # child process entry point
+    global _publish_hook, _trace_suffix
+    _trace_suffix = ".collector"
+    probe_costs.update(costs or {})
+    apply_config(cfg)
+
+    def publish(out):
+        global _worker_stop
+        try:
+            data_conn.send(_pipe_encode(out))
+        except (BrokenPipeError, EOFError, OSError):
+            _worker_stop = True     # GUI is gone
 
+    _publish_hook = publish
+    threading.Thread(target=_collector_cmd_loop, args=(cmd_conn,), daemon=True).start()
+    stats_worker_loop()
+    export_trace()
+
+class CollectorProcess:
+    def __init__(self):
+        self.proc = None
+        self.cmd = None
+        self.last_msg = 0.0
+        self.restarts = 0
+        self._next_start = 0.0
+        self._backoff = 1.0
+
+    def start(self, cfg):
+        import multiprocessing
+        ctx = multiprocessing.get_context("spawn")
+        data_r, data_w = ctx.Pipe(duplex=False)
+        cmd_r, cmd_w = ctx.Pipe(duplex=False)
+        with stats_lock:
+            costs = dict(stats.get("probe_costs") or {})
+        self.proc = ctx.Process(target=collector_main, args=(cfg, data_w, cmd_r, costs),
+                                name="overlay-collector", daemon=True)
+        self.proc.start()
+        data_w.close()
+        cmd_r.close()
+        self.cmd = cmd_w
+        self.last_msg = time.monotonic()
+        threading.Thread(target=self._read_loop, args=(data_r,), daemon=True).start()
+
+    def _read_loop(self, conn):
+        while True:
+            try:
+                out = conn.recv()
+            except (EOFError, OSError):
+                break
+            self.last_msg = time.monotonic()
+            if out:
+                out = _pipe_decode(out)
+                with stats_lock:
+                    stats.update(out)
+                    if _startup is not None:
+                        _startup.seen(out, True)
+        conn.close()
+
+    def send_config(self, cfg):
+        try:
+            self.cmd.send(("config", cfg))
+        except Exception:
+            pass
+
+    def check(self, cfg):
+        # called from a GUI timer; restarts a crashed or hung child with backoff
+        now = time.monotonic()
+        if self.proc is None:
+            if now >= self._next_start:
+                self.start(cfg)
+            return
+        if self.proc.is_alive() and now - self.last_msg < COLLECTOR_HANG_S:
+            if now - self.last_msg < COLLECTOR_HEARTBEAT_S * 2:
+                self._backoff = 1.0
+            return
+        reason = "hung" if self.proc.is_alive() else f"exited ({self.proc.exitcode})"
+        print(f"collector {reason}, restarting in {self._backoff:.0f}s")
+        self.stop(0.5)
+        self.restarts += 1
+        self._next_start = now + self._backoff
+        self._backoff = min(COLLECTOR_MAX_BACKOFF_S, self._backoff * 2)
+
+    def stop(self, timeout=WORKER_JOIN_S):
+        if self.proc is None:
+            return
+        try:
+            self.cmd.send(("stop", None))
+        except Exception:
+            pass
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join(0.5)
+        try:
+            self.cmd.close()
+        except Exception:
+            pass
+        self.proc = None
+
+# UI frame jitter
+# Deviation of each update_overlay call from the timer interval, kept in a ring.
+class FrameJitter:
+    def __init__(self, size=512):
+        self._ring = np.zeros(size)
+        self._n = 0
+        self._last = None
+
+    def tick(self, interval_s):
+        now = time.perf_counter()
+        if self._last is not None:
+            self._ring[self._n % len(self._ring)] = abs((now - self._last) - interval_s) * 1000.0
+            self._n += 1
+        self._last = now
+
+    def summary(self):
+        data = self._ring[:min(self._n, len(self._ring))]
+        if not len(data):
+            return None
+        return float(data.mean()), float(np.percentile(data, 99)), float(data.max())
+
+# Text rendering
+# Shared by the Qt labels and the headless renderers.
+_LEVEL_BLOCKS = " ▁▂▃▄▅▆▇█"
+
+def levels_text(levels):
+    return "".join([_LEVEL_BLOCKS[b * 8 // 255] for b in levels])
+
+def progress_text(timeline, width=10):
+    if timeline is None:
+        return ""
+    pos, anchor, duration, rate = timeline
+    if rate:
+        pos = min(duration, pos + (time.monotonic() - anchor) * rate)
+    filled = int(width * pos / duration)
+    return "━" * filled + "─" * (width - filled)
+
+def widget_text(name, kind, opts, snapshot):
+    if kind == "timer":
+        return f"Timer: {timer_get_seconds_int():03d}"
+    if kind == "mic":
+        bars = max(0, min(10, snapshot.get(name + "_bars", 0)))
+        cells = ["█"] * bars + ["░"] * (10 - bars)
+        peak = snapshot.get(name + "_peak", 0)
+        if peak >= bars and peak > 0:
+            cells[peak] = "▐"
+        clip = " CLIP" if snapshot.get(name + "_clip") else ""
+        return f"{opts['label']}: {''.join(cells)} {snapshot.get(name + '_percent', 0)}%{clip}"
+    if kind == "cpu_heatmap":
+        return levels_text(snapshot.get("cpu_cells", b""))
+    if kind == "spectrum":
+        return levels_text(snapshot.get("mic_spectrum", b""))
+    if kind == "progress":
+        return progress_text(snapshot.get("media_timeline"))
+    if kind in ("art", "jitter"):
+        return ""
+    return snapshot.get(name, "")
+
+def alert_colors(snapshot):
+    colors = {}
+    for name, color, widget in snapshot.get("alerts", ()):
+        if widget and widget not in colors:
+            colors[widget] = color
+    return colors
+
+# Headless renderers
+# Each keeps its output rate (frames and bytes written) so the sampling
+# engine's cost can be measured without Qt.
+class _RendererStats:
+    def __init__(self, stream):
+        self.stream = stream
+        self.frames = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+
+    def write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+        self.frames += 1
+        self.bytes += len(text.encode("utf-8"))
+
+    def summary(self):
+        dt = max(1e-6, time.monotonic() - self.started)
+        return (f"{type(self).__name__}: {self.frames} frames in {dt:.1f}s "
+                f"({self.frames / dt:.2f}/s, {self.bytes / dt / 1024:.2f} KB/s)")
+
+class TerminalRenderer(_RendererStats):
+    # one status line; only runs of cells that changed are rewritten
+    SEPARATOR = "  "
+    ALERT_SGR = "\x1b[1;31m"
+    RESET_SGR = "\x1b[0m"
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self._cells = []
+
+    def start(self):
+        if sys.platform == "win32":
+            os.system("")   # enables VT sequences in the Windows console
+        self.stream.write("\x1b[?25l")
+
+    def stop(self):
+        self.stream.write(self.RESET_SGR + "\x1b[?25h\n")
+        self.stream.flush()
+
+    def render(self, snapshot, widgets):
+        alerts = alert_colors(snapshot)
+        cells = []
+        for name, kind, opts in widgets:
+            text = widget_text(name, kind, opts, snapshot)
+            if not text:
+                continue
+            if cells:
+                cells.extend((ch, False) for ch in self.SEPARATOR)
+            cells.extend((ch, name in alerts) for ch in text)
+        width = shutil.get_terminal_size((120, 24)).columns - 1
+        cells = cells[:width]
+        cells.extend([(" ", False)] * (len(self._cells) - len(cells)))
+
+        old = self._cells
+        parts = []
+        i = 0
+        while i < len(cells):
+            if i < len(old) and cells[i] == old[i]:
+                i += 1
+                continue
+            # changed run, move the cursor once and write it
+            j = i
+            while j < len(cells) and not (j < len(old) and cells[j] == old[j]):
+                j += 1
+            parts.append(f"\x1b[{i + 1}G")
+            alert = None
+            for ch, a in cells[i:j]:
+                if a != alert:
+                    parts.append(self.ALERT_SGR if a else self.RESET_SGR)
+                    alert = a
+                parts.append(ch)
+            parts.append(self.RESET_SGR)
+            i = j
+        self._cells = cells
+        if parts:
+            self.write("".join(parts))
+
+class I3barRenderer(_RendererStats):
+    # i3bar / swaybar JSON protocol, one block per widget, lines only on change
+    def __init__(self, stream):
+        super().__init__(stream)
+        self._last = None
+
+    def start(self):
+        self.stream.write('{"version": 1}\n[\n')
+        self.stream.flush()
+
+    def stop(self):
+        self.stream.flush()
+
+    def render(self, snapshot, widgets):
+        alerts = alert_colors(snapshot)
+        blocks = []
+        for name, kind, opts in widgets:
+            text = widget_text(name, kind, opts, snapshot)
+            if not text:
+                continue
+            block = {"name": name, "full_text": text}
+            if name in alerts:
+                block["color"] = alerts[name]
+                block["urgent"] = True
+            blocks.append(block)
+        line = json.dumps(blocks, ensure_ascii=False)
+        if line != self._last:
+            self._last = line
+            self.write(line + ",\n")
+
+class WaybarRenderer(_RendererStats):
+    # waybar custom module with "return-type": "json", one object per line
+    def __init__(self, stream):
+        super().__init__(stream)
+        self._last = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.stream.flush()
+
+    def render(self, snapshot, widgets):
+        texts = []
+        for name, kind, opts in widgets:
+            text = widget_text(name, kind, opts, snapshot)
+            if text:
+                texts.append(text)
+        alerts = [a[0] for a in snapshot.get("alerts", ())]
+        obj = {"text": "  ".join(texts), "tooltip": "\n".join(texts), "class": alerts}
+        if "cpu_pct" in snapshot:
+            obj["percentage"] = int(snapshot["cpu_pct"])
+        line = json.dumps(obj, ensure_ascii=False)
+        if line != self._last:
+            self._last = line
+            self.write(line + "\n")
+
+def run_headless(renderer_cls):
+    # same collector and config handling as the window, rendering to stdout;
+    # stray prints go to stderr so the protocol stream stays clean
+    global _worker_stop, _startup
+    out_stream = sys.stdout
+    sys.stdout = sys.stderr
+    renderer = renderer_cls(out_stream)
+    watcher = ConfigWatcher(CONFIG_PATH)
+    collector = None
+    worker = None
+    if config.get("collector") == "process":
+        collector = CollectorProcess()
+        collector.start(config)
+    else:
+        worker = threading.Thread(target=stats_worker_loop, daemon=True)
+        worker.start()
+    if "time" in config["widgets"] or "date" in config["widgets"]:
+        threading.Thread(target=clock_worker_loop, daemon=True).start()
+
+    renderer.start()
+    next_check = 0.0
+    next_save = time.monotonic() + WARM_CACHE_INTERVAL
     try:
-        pythoncom.CoUninitialize()
-    except Exception:
+        while True:
+            now = time.monotonic()
+            if now >= next_save and config.get("warm_cache"):
+                next_save = now + WARM_CACHE_INTERVAL
+                save_warm_cache()
+            if now >= next_check:
+                next_check = now + CONFIG_POLL_MS / 1000.0
+                if collector is not None:
+                    collector.check(config)
+                if watcher.changed():
+                    old = config
+                    try:
+                        cfg = load_config(CONFIG_PATH)
+                        apply_config(cfg)
+                        if collector is not None:
+                            collector.send_config(cfg)
+                    except Exception:
+                        traceback.print_exc()
+                        apply_config(old)
+            widgets = [(name, name.partition(":")[0], opts) for name, opts in config["widgets"].items()]
+            with stats_lock:
+                snapshot = dict(stats)
+                done = _startup is not None and _startup.frame()
+            if done:
+                print(_startup.report(), file=sys.stderr)
+                _startup = None
+            if _tracer is None:
+                renderer.render(snapshot, widgets)
+            else:
+                t0 = time.perf_counter_ns()
+                renderer.render(snapshot, widgets)
+                _tracer.add("render", t0)
+            time.sleep(config["ui_interval_ms"] / 1000.0)
+    except (KeyboardInterrupt, BrokenPipeError):
+        # Ctrl+C, or the bar that was reading us went away
         pass
+    finally:
+        try:
+            renderer.stop()
+        except OSError:
+            pass
+        _worker_stop = True
+        if worker is not None:
+            worker.join(WORKER_JOIN_S)
+        if collector is not None:
+            collector.stop()
+        print(renderer.summary(), file=sys.stderr)
+        if _startup is not None:
+            print(_startup.report(), file=sys.stderr)
+        if config.get("warm_cache"):
+            save_warm_cache()
+        export_trace()
+
+# CPU heatmap strip
+class CpuHeatmap(QWidget):
+    def __init__(self, height=18, cell_width=CPU_HEATMAP_CELL_W):
+        super().__init__()
+        self._cells = b""
+        self._h = height
+        self._cell_w = cell_width
+        # 0..255 levels -> 16 precomputed colours, dark grey to red
+        self._palette = [QColor.fromHsv(int(120 - 120 * i / 15), 200, 90 + int(165 * i / 15))
+                         for i in range(16)]
+        self._palette[0] = QColor(40, 40, 40)
+        self.setFixedSize(cell_width, height)
+
+    def set_levels(self, cells, cost_us=0.0):
+        if cells == self._cells:
+            return
+        if len(cells) != len(self._cells):
+            self.setFixedSize(max(1, len(cells)) * self._cell_w, self._h)
+        self._cells = cells
+        self.setToolTip(f"{len(cells)} cells, sample cost {cost_us:.0f} us")
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        w = self._cell_w
+        for i, level in enumerate(self._cells):
+            p.fillRect(i * w, 0, w - 1, self._h, self._palette[level >> 4])
+        p.end()
+
+# Mic spectrum bars
+class SpectrumBars(QWidget):
+    def __init__(self, height=18, bar_width=3):
+        super().__init__()
+        self._levels = b""
+        self._h = height
+        self._bar_w = bar_width
+        self.setFixedSize(bar_width, height)
+
+    def set_levels(self, levels, cost_us=0.0):
+        if levels == self._levels:
+            return
+        if len(levels) != len(self._levels):
+            self.setFixedSize(max(1, len(levels)) * self._bar_w, self._h)
+        self._levels = levels
+        self.setToolTip(f"{len(levels)} bands, {cost_us:.0f} us per block")
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        color = QColor(current_color)
+        w = self._bar_w
+        h = self._h
+        for i, level in enumerate(self._levels):
+            bar = level * h // 255
+            if bar:
+                p.fillRect(i * w, h - bar, w - 1, bar, color)
+        p.end()
+
+# Media progress bar
+# Position is extrapolated locally from the last timeline snapshot, the bar
+# only repaints when the filled width moves by a pixel.
+class MediaProgress(QWidget):
+    def __init__(self, width=80, height=4):
+        super().__init__()
+        self._timeline = None
+        self._px = -1
+        self.setFixedSize(width, height)
+
+    def set_timeline(self, timeline):
+        self._timeline = timeline
+        if timeline is None:
+            px = -1
+        else:
+            pos, anchor, duration, rate = timeline
+            if rate:
+                pos = min(duration, pos + (time.monotonic() - anchor) * rate)
+            px = int(self.width() * pos / duration)
+        if px != self._px:
+            self._px = px
+            self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(0, 0, self.width(), self.height(), QColor(40, 40, 40))
+        if self._px > 0:
+            p.fillRect(0, 0, self._px, self.height(), QColor(current_color))
+        p.end()
+
+# Album art label, converts to a pixmap only when the track changes
+class AlbumArtLabel(QLabel):
+    def __init__(self):
+        super().__init__()
+        self._key = None
+
+    def set_art(self, art, tooltip=""):
+        key = art[0] if art else None
+        if key == self._key:
+            return
+        self._key = key
+        if art is None:
+            self.clear()
+            self.hide()
+        else:
+            self.setPixmap(QPixmap.fromImage(art[1]))
+            self.show()
+        self.setToolTip(tooltip)
+
+# Scrolling media title
+# Fixed width so a long title never re-lays out the bar. Each title is drawn
+# once into a cached pixmap; animating only moves the offset it is blitted at.
+class MarqueeLabel(QWidget):
+    GAP = 40    # px between the end of the title and its repeat
+
+    def __init__(self, width=260, height=18, speed=30.0, fps=30, pause=1.5):
+        super().__init__()
+        self.setFixedSize(width, height)
+        self._speed = max(1.0, float(speed))
+        self._pause = float(pause)
+        self._text = None
+        self._color = None
+        self._font_size = None
+        self._pixmap = None
+        self._loop_w = 0
+        self._offset = 0
+        self._t0 = 0.0
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(10, int(1000 / max(1, fps))))
+        self._timer.timeout.connect(self._tick)
+        # animation cost: time spent in _tick + paintEvent over wall time
+        self._cost_s = 0.0
+        self._frames = 0
+        self._cost_t0 = time.perf_counter()
+
+    def set_style(self, color, font_size):
+        if color == self._color and font_size == self._font_size:
+            return
+        self._color = color
+        self._font_size = font_size
+        self._render()
+
+    def setText(self, text):
+        if text == self._text:
+            return
+        self._text = text
+        self._render()
+
+    def _render(self):
+        # the only place text gets laid out and rasterised
+        if self._text is None or self._color is None:
+            return
+        font = QFont(self.font())
+        font.setPixelSize(int(self._font_size))
+        fm = QFontMetrics(font)
+        text_w = fm.horizontalAdvance(self._text)
+        scrolling = text_w > self.width()
+        self._loop_w = text_w + self.GAP if scrolling else 0
+        dpr = self.devicePixelRatioF()
+        pm = QPixmap(int((text_w + 1) * dpr), int(self.height() * dpr))
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(Qt.transparent)
+        p = QPainter(pm)
+        p.setFont(font)
+        p.setPen(QColor(self._color))
+        p.drawText(0, (self.height() + fm.ascent() - fm.descent()) // 2, self._text)
+        p.end()
+        self._pixmap = pm
+        self._offset = 0
+        self._t0 = time.monotonic()
+        self.setToolTip(self._text if scrolling else "")
+        if scrolling:
+            self._timer.start()
+        else:
+            self._timer.stop()
+        self.update()
+
+    def _tick(self):
+        t = time.perf_counter()
+        cycle = self._loop_w / self._speed + self._pause
+        phase = (time.monotonic() - self._t0) % cycle
+        offset = int(max(0.0, phase - self._pause) * self._speed)
+        if offset != self._offset:
+            self._offset = offset
+            self.update()
+        self._cost_s += time.perf_counter() - t
+
+    def paintEvent(self, event):
+        if self._pixmap is None:
+            return
+        t = time.perf_counter()
+        p = QPainter(self)
+        p.drawPixmap(-self._offset, 0, self._pixmap)
+        if self._loop_w:
+            p.drawPixmap(self._loop_w - self._offset, 0, self._pixmap)
+        p.end()
+        self._frames += 1
+        self._cost_s += time.perf_counter() - t
+
+    def cost_text(self):
+        wall = max(1e-6, time.perf_counter() - self._cost_t0)
+        per_frame = self._cost_s / self._frames * 1e6 if self._frames else 0.0
+        return (f"Marquee: {self._frames} frames, {per_frame:.0f} us/frame, "
+                f"{100.0 * self._cost_s / wall:.3f}% of a core")
+
+# Repaint spans
+# Only used when tracing is on at startup: every paint event delivered to a
+# widget becomes a "paint <class>" span, the plain QApplication has no hook.
+class TracingApplication(QApplication):
+    def notify(self, receiver, event):
+        if _tracer is None or event.type() != QEvent.Paint:
+            return super().notify(receiver, event)
+        t0 = time.perf_counter_ns()
+        result = super().notify(receiver, event)
+        _tracer.add("paint " + type(receiver).__name__, t0)
+        return result
 
 # Overlay UI
 class Overlay(QWidget):
+    # pynput calls back on its own thread, the key is queued to the GUI thread
+    # because labels, pixmaps and timers may only be touched from there
+    hotkey = pyqtSignal(int)
+
     def __init__(self):
         super().__init__()
-        global current_color
 
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
-        self.setStyleSheet("background-color: black;")
-
-        try:
-            scr_w = QApplication.primaryScreen().size().width()
-        except Exception:
-            scr_w = 800
-        self.setGeometry(0, 0, scr_w, 26)
+        # background via the palette so alert flashes repaint without restyling children
+        self.setAutoFillBackground(True)
+        self._background = None
+        self.set_background("black")
+        self._alerts = ()
+        self._alert_colors = {}
 
         layout = QHBoxLayout()
         layout.setContentsMargins(8, 2, 8, 2)
-        layout.setSpacing(90)
-
-        self.battery_label = QLabel()
-        self.ram_label = QLabel()
-        self.gpu_label = QLabel()
-        self.cpu_label = QLabel()
-        self.app_label = QLabel()
-        self.date_label = QLabel()
-        self.time_label = QLabel()
-        self.timer_label = QLabel()
-        self.mic_label = QLabel()
-        self.spotify_label = QLabel()
-
-        self.labels = [
-            self.battery_label, self.ram_label, self.gpu_label, self.cpu_label,
-            self.app_label, self.date_label, self.time_label, self.timer_label,
-            self.mic_label, self.spotify_label
-        ]
-
-        for lbl in self.labels:
-            lbl.setStyleSheet(f"color: {current_color}; font-size: 12px;")
-            layout.addWidget(lbl)
-
-        layout.addStretch(1)
         self.setLayout(layout)
 
+        self.widgets = {}
+        self.widget_list = []
+        self.build_widgets()
+
         # UI update timer
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_overlay)
-        self.update_timer.start(200)
-
-        # Start worker thread
-        self.worker_thread = threading.Thread(target=stats_worker_loop, daemon=True)
-        self.worker_thread.start()
+        self.update_timer.start(config["ui_interval_ms"])
+
+        # Config hot reload
+        self.config_watcher = ConfigWatcher(CONFIG_PATH)
+        self.config_timer = QTimer()
+        self.config_timer.timeout.connect(self.check_config)
+        self.config_timer.start(CONFIG_POLL_MS)
+
+        # Start the collector, in-process thread or supervised child process
+        self.collector = None
+        self.worker_thread = None
+        if config.get("collector") == "process":
+            self.collector = CollectorProcess()
+            self.collector.start(config)
+            self.collector_timer = QTimer()
+            self.collector_timer.timeout.connect(lambda: self.collector.check(config))
+            self.collector_timer.start(1000)
+        else:
+            self.worker_thread = threading.Thread(target=stats_worker_loop, daemon=True)
+            self.worker_thread.start()
+        self.jitter = FrameJitter()
+        if config.get("warm_cache"):
+            self.cache_timer = QTimer()
+            self.cache_timer.timeout.connect(save_warm_cache)
+            self.cache_timer.start(int(WARM_CACHE_INTERVAL * 1000))
+        self.clock_thread = None
+        self.start_clock_thread()
+
+        self.usage_text = ""
+        self.usage_days = 1
+        self.usage_until = 0.0
 
         # Hotkeys listener
+        from pynput import keyboard
         self.keys_down = set()
+        self.hotkey.connect(self.handle_hotkey, Qt.QueuedConnection)
         self.listener = keyboard.Listener(on_press=self.key_press, on_release=self.key_release)
         self.listener.start()
 
+    def start_clock_thread(self):
+        widgets = config["widgets"]
+        if "time" not in widgets and "date" not in widgets:
+            return
+        if self.clock_thread is None or not self.clock_thread.is_alive():
+            self.clock_thread = threading.Thread(target=clock_worker_loop, daemon=True)
+            self.clock_thread.start()
+
+    def build_widgets(self):
+        layout = self.layout()
+        while layout.count():
+            item = layout.takeAt(0)
+            if item.widget() is not None:
+                item.widget().deleteLater()
+
+        height = int(config["height"])
+        try:
+            scr_w = QApplication.primaryScreen().size().width()
+        except Exception:
+            scr_w = 800
+        self.setGeometry(0, 0, scr_w, height)
+        layout.setSpacing(int(config["spacing"]))
+
+        self.widgets = {}
+        self.widget_list = []
+        for name, opts in config["widgets"].items():
+            kind = name.partition(":")[0]
+            if kind == "cpu_heatmap":
+                w = CpuHeatmap(max(4, height - 8), int(opts["cell_width"]))
+            elif kind == "art":
+                w = AlbumArtLabel()
+                w.hide()
+            elif kind == "progress":
+                w = MediaProgress(int(opts["width"]))
+            elif kind == "spectrum":
+                w = SpectrumBars(max(4, height - 8), int(opts["bar_width"]))
+            elif kind == "spotify" and opts["marquee"]:
+                w = MarqueeLabel(int(opts["width"]), height - 4, float(opts["speed"]), int(opts["fps"]))
+            else:
+                w = QLabel()
+            self.widgets[name] = w
+            self.widget_list.append((name, kind, w, opts))
+            layout.addWidget(w)
+        layout.addStretch(1)
+        self.apply_colors()
+
+    def check_config(self):
+        if not self.config_watcher.changed():
+            return
+        old = config
+        try:
+            cfg = load_config(CONFIG_PATH)
+            apply_config(cfg)
+            self.build_widgets()
+            self.update_timer.setInterval(int(cfg["ui_interval_ms"]))
+        except Exception:
+            # half-saved or invalid file, keep running with the old config
+            # (an exception escaping a Qt slot would abort the overlay)
+            traceback.print_exc()
+            try:
+                apply_config(old)
+                self.build_widgets()
+            except Exception:
+                traceback.print_exc()
+            return
+        if self.collector is not None:
+            self.collector.send_config(cfg)
+        self.start_clock_thread()
+        self.update_overlay()
+
     # hotkey handling
     def key_press(self, key):
-        global color_index, current_color, _worker_stop
-
         if not hasattr(key, "vk"):
             return
         vk = key.vk
@@ -387,6 +3648,10 @@ class Overlay(QWidget):
         if vk in self.keys_down:
             return
         self.keys_down.add(vk)
+        self.hotkey.emit(vk)
+
+    def handle_hotkey(self, vk):
+        global color_index, current_color
 
         # Numpad 7 -> timer cycle
         if vk == 103:
@@ -406,61 +3671,168 @@ class Overlay(QWidget):
             current_color = COLOR_CYCLE[color_index]
             self.apply_colors()
 
+        # Numpad 6 -> app usage: today, then the last 7 days, then back
+        if vk == 102:
+            showing = time.monotonic() < self.usage_until
+            if showing and self.usage_days == 7:
+                self.usage_until = 0.0
+            else:
+                self.usage_days = 7 if showing else 1
+                self.usage_text = usage_line(self.usage_days)
+                self.usage_until = time.monotonic() + USAGE_SHOW_S
+                print(self.usage_text)
+
         # Numpad 9 -> full restart
         if vk == 105:
             try:
-                _worker_stop = True
-                time.sleep(0.05)
+                self.stop_collector()
             except Exception:
-                pass
+                traceback.print_exc()
             os.execv(sys.executable, [sys.executable] + sys.argv)
 
+    def stop_collector(self):
+        # lets the worker run its cleanup (usage flush, calibration, shm) before we exit
+        global _worker_stop
+        _worker_stop = True
+        if self.worker_thread is not None:
+            self.worker_thread.join(WORKER_JOIN_S)
+        if self.collector is not None:
+            self.collector.stop()
+            self.collector = None
+
     def key_release(self, key):
         if hasattr(key, "vk"):
             self.keys_down.discard(key.vk)
 
+    def set_background(self, color):
+        if color == self._background:
+            return
+        self._background = color
+        pal = self.palette()
+        pal.setColor(QPalette.Window, QColor(color))
+        self.setPalette(pal)
+
+    def style_label(self, lbl, color):
+        if isinstance(lbl, MarqueeLabel):
+            lbl.set_style(color, config["font_size"])
+        else:
+            lbl.setStyleSheet(f"color: {color}; font-size: {config['font_size']}px;")
+
     def apply_colors(self):
-        for lbl in self.labels:
-            lbl.setStyleSheet(f"color: {current_color}; font-size: 12px;")
+        for name, kind, w, opts in self.widget_list:
+            if isinstance(w, (QLabel, MarqueeLabel)) and kind != "art":
+                self.style_label(w, self._alert_colors.get(name, current_color))
+        for w in self.widgets.values():
+            if not isinstance(w, (QLabel, MarqueeLabel)):
+                w.update()
+
+    def apply_alerts(self, alerts):
+        # only labels whose alert colour changes get a new stylesheet
+        self._alerts = alerts
+        colors = {}
+        for name, color, widget in alerts:
+            if widget and widget not in colors:
+                colors[widget] = color
+        for name in set(colors) | set(self._alert_colors):
+            w = self.widgets.get(name)
+            if (w is not None and colors.get(name) != self._alert_colors.get(name)
+                    and isinstance(w, (QLabel, MarqueeLabel))):
+                self.style_label(w, colors.get(name, current_color))
+        self._alert_colors = colors
+        if not alerts:
+            self.set_background("black")
+
+    def jitter_text(self):
+        summary = self.jitter.summary()
+        if summary is None:
+            return "Jitter: --"
+        mean, p99, worst = summary
+        mode = "process" if self.collector is not None else "thread"
+        return f"Jitter ({mode}): avg {mean:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms"
 
     def update_overlay(self):
+        if _tracer is None:
+            self._update_overlay()
+        else:
+            t0 = time.perf_counter_ns()
+            self._update_overlay()
+            _tracer.add("update_overlay", t0)
+
+    def _update_overlay(self):
+        global _startup
+        self.jitter.tick(self.update_timer.interval() / 1000.0)
         with stats_lock:
-            batt = stats.get("battery", "Battery: --%")
-            ram = stats.get("ram", "RAM: --%")
-            gpu = stats.get("gpu", "GPU: --%")
-            cpu = stats.get("cpu", "CPU: --%")
-            app = stats.get("app", "App: —")
-            date = stats.get("date", "Date: --/--/----")
-            tim = stats.get("time", "Time: --:--")
-            mic_bars = stats.get("mic_bars", 0)
-            mic_percent = stats.get("mic_percent", 0)
-            spotify_text = stats.get("spotify", "Spotify: —")
-
-        self.battery_label.setText(batt)
-        self.ram_label.setText(ram)
-        self.gpu_label.setText(gpu)
-        self.cpu_label.setText(cpu)
-        self.app_label.setText(app)
-        self.date_label.setText(date)
-        self.time_label.setText(tim)
-
-        # timer display 
-        secs = timer_get_seconds_int()
-        self.timer_label.setText(f"Timer: {secs:03d}")
-
-        bars = max(0, min(10, mic_bars))
-        mic_bar = "█" * bars + "░" * (10 - bars)
-        self.mic_label.setText(f"Mic: {mic_bar} {mic_percent}%")
-
-        self.spotify_label.setText(spotify_text)
+            snapshot = dict(stats)
+            done = _startup is not None and _startup.frame()
+        if done:
+            print(_startup.report())
+            _startup = None
+
+        alerts = snapshot.get("alerts", ())
+        if alerts != self._alerts:
+            self.apply_alerts(alerts)
+        if self._alerts:
+            on = int(time.monotonic() * ALERT_FLASH_HZ * 2) % 2 == 0
+            self.set_background(self._alerts[0][1] if on else "black")
+
+        for name, kind, w, opts in self.widget_list:
+            if kind == "cpu_heatmap":
+                w.set_levels(snapshot.get("cpu_cells", b""), snapshot.get("cpu_cost_us", 0.0))
+            elif kind == "art":
+                w.set_art(snapshot.get("art"), snapshot.get("art_stats", ""))
+            elif kind == "progress":
+                w.set_timeline(snapshot.get("media_timeline"))
+            elif kind == "jitter":
+                w.setText(self.jitter_text())
+            elif kind == "spectrum":
+                w.set_levels(snapshot.get("mic_spectrum", b""), snapshot.get("mic_spectrum_cost_us", 0.0))
+            elif kind == "app" and time.monotonic() < self.usage_until:
+                w.setText(self.usage_text)
+            else:
+                w.setText(widget_text(name, kind, opts, snapshot))
 
 # RUN
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if "--bench-cpu" in sys.argv:
+        bench_cpu_sampler()
+        sys.exit(0)
+    if "--bench-spectrum" in sys.argv:
+        bench_spectrum()
+        sys.exit(0)
+    if "--usage" in sys.argv:
+        print_usage_report()
+        sys.exit(0)
+    if "--write-config" in sys.argv:
+        write_default_config()
+        sys.exit(0)
+    try:
+        apply_config(load_config())
+    except Exception:
+        traceback.print_exc()
+        apply_config(load_config(None))
+    _startup = StartupTimer(startup_keys(config["widgets"]))
+    if config.get("warm_cache"):
+        load_warm_cache()
+    if HEADLESS:
+        renderers = {"--term": TerminalRenderer, "--i3bar": I3barRenderer, "--waybar": WaybarRenderer}
+        run_headless(next(cls for flag, cls in renderers.items() if flag in sys.argv))
+        sys.exit(0)
+    app = TracingApplication(sys.argv) if _tracer is not None else QApplication(sys.argv)
     overlay = Overlay()
     overlay.show()
     try:
-        print("Overlay started. Use Numpad 7 to control timer, 8 to change color, 9 to restart.")
+        print("Overlay started. Use Numpad 6 for app usage, 7 to control timer, 8 to change color, 9 to restart.")
         sys.exit(app.exec_())
     finally:
-        _worker_stop = True
+        overlay.stop_collector()
+        print(overlay.jitter_text())
+        for w in overlay.widgets.values():
+            if isinstance(w, MarqueeLabel):
+                print(w.cost_text())
+        if _startup is not None:
+            print(_startup.report())
+        if config.get("warm_cache"):
+            save_warm_cache()
+        export_trace()
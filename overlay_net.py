@@ -0,0 +1,365 @@
+'''
+Multi-host aggregation for the Useful Overlay.
+Overlays on other machines push their numeric stats to one aggregator over
+TCP; the aggregator's bar shows a CPU / RAM / GPU field per host. Only the
+standard library is needed.
+
+Wire format, every frame is a u16 little-endian length then the payload:
+    hello:  b"H", host name (utf-8)
+    key:    b"K", then (u8 field id, f32 value) for every known field
+    delta:  b"D", then (u8 field id, f32 value) for fields that changed
+An agent sends a key frame after connecting and every KEYFRAME_S seconds,
+deltas in between, and an empty delta as a heartbeat when nothing changed.
+
+The aggregator is one thread around a selector, whatever the number of hosts.
+The agent never blocks the overlay's worker: host names are resolved on a
+short-lived thread, the socket is non-blocking and only written once the
+connect has completed (writable, SO_ERROR clear), it reconnects with backoff
+and drops frames (then sends a key frame) when the connection can't keep up.
+
+Usage:
+    python overlay_net.py --simulate 24     (aggregator + 24 local fake agents)
+'''
+
+import random
+import select
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+
+DEFAULT_PORT = 48650
+FIELDS = ("cpu_pct", "ram_pct", "gpu_pct", "battery_pct", "cpu_temp", "gpu_temp",
+          "net_rx_bps", "net_tx_bps", "disk_read_bps", "disk_write_bps")
+FIELD_IDS = {name: i for i, name in enumerate(FIELDS)}
+# smallest change worth a delta, per field
+EPSILON = {"net_rx_bps": 1024.0, "net_tx_bps": 1024.0, "disk_read_bps": 1024.0, "disk_write_bps": 1024.0}
+DEFAULT_EPSILON = 0.5
+
+LENGTH = struct.Struct("<H")
+ENTRY = struct.Struct("<Bf")
+KEYFRAME_S = 10.0
+HEARTBEAT_S = 1.0
+MAX_BUFFER = 16 * 1024       # agent send backlog before frames are dropped
+CONNECT_TIMEOUT_S = 5.0
+STALE_S = 5.0
+FORGET_S = 600.0             # hosts silent this long are dropped from the bar
+
+def parse_address(text, default_host="127.0.0.1"):
+    # "host:port", "host:" or ":port"; ValueError for anything else
+    host, _, port = str(text).rpartition(":")
+    port = int(port or DEFAULT_PORT)
+    if not 0 <= port <= 65535:
+        raise ValueError(f"port {port} out of range")
+    return (host or default_host), port
+
+def encode(kind, entries):
+    payload = kind + b"".join(ENTRY.pack(FIELD_IDS[k], v) for k, v in entries)
+    return LENGTH.pack(len(payload)) + payload
+
+def encode_hello(host):
+    payload = b"H" + host.encode("utf-8")[:255]
+    return LENGTH.pack(len(payload)) + payload
+
+def decode_entries(payload):
+    values = {}
+    for off in range(1, len(payload) - ENTRY.size + 1, ENTRY.size):
+        fid, value = ENTRY.unpack_from(payload, off)
+        if fid < len(FIELDS):
+            values[FIELDS[fid]] = value
+    return values
+
+class Agent:
+    # pushes from the overlay's worker thread, update() never blocks
+    def __init__(self, address, host=None):
+        self.address = parse_address(address)
+        self.host = host or socket.gethostname()
+        self._sockaddr = None    # resolved address, None until the resolver is done
+        self._resolver = None
+        self._resolve_error = None
+        self._connect_deadline = 0.0
+        self.values = {}
+        self.sent = {}
+        self.sock = None
+        self.connected = False
+        self.buffer = bytearray()
+        self.bytes_sent = 0
+        self.frames = 0
+        self.dropped = 0
+        self._next_key = 0.0
+        self._last_send = 0.0
+        self._next_connect = 0.0
+        self._backoff = 1.0
+
+    def _resolve(self):
+        # getaddrinfo can block for seconds on a bad or slow DNS, never on the worker
+        try:
+            infos = socket.getaddrinfo(self.address[0], self.address[1], socket.AF_INET, socket.SOCK_STREAM)
+            self._sockaddr = infos[0][4]
+        except OSError as e:
+            self._resolve_error = e
+
+    def _connect(self, now):
+        if self._sockaddr is None:
+            if self._resolver is None:
+                self._resolve_error = None
+                self._resolver = threading.Thread(target=self._resolve, name="overlay-agent-dns", daemon=True)
+                self._resolver.start()
+                return
+            if self._resolver.is_alive():
+                return
+            self._resolver = None
+            if self._sockaddr is None:
+                print(f"push: can't resolve {self.address[0]}: {self._resolve_error}", file=sys.stderr)
+                self._retry_later(now)
+                return
+        self._retry_later(now)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.connect_ex(self._sockaddr)
+        self.connected = False
+        self._connect_deadline = now + CONNECT_TIMEOUT_S
+        self.buffer = bytearray(encode_hello(self.host))
+        self._next_key = 0.0
+
+    def _retry_later(self, now):
+        self._next_connect = now + self._backoff
+        self._backoff = min(30.0, self._backoff * 2)
+
+    def _check_connected(self, now):
+        # a non-blocking connect is done once the socket turns writable (or,
+        # on Windows, shows up in the except set); SO_ERROR tells how it went
+        try:
+            _, w, x = select.select([], [self.sock], [self.sock], 0)
+            if not w and not x:
+                if now >= self._connect_deadline:
+                    self._drop()
+                return
+            failed = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        except (OSError, ValueError):
+            failed = True
+        if failed:
+            self._drop()
+            return
+        self.connected = True
+        self._backoff = 1.0
+
+    def _drop(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.connected = False
+        self._sockaddr = None    # resolve again on reconnect, the host may have moved
+
+    def update(self, out, now=None):
+        now = time.monotonic() if now is None else now
+        for key in FIELDS:
+            if key in out:
+                self.values[key] = float(out[key])
+        if self.sock is None:
+            if now < self._next_connect:
+                return
+            self._connect(now)
+            if self.sock is None:
+                return
+        if not self.connected:
+            self._check_connected(now)
+            if self.sock is None:
+                return
+        if now >= self._next_key:
+            self._next_key = now + KEYFRAME_S
+            entries = list(self.values.items())
+            kind = b"K"
+        else:
+            sent = self.sent
+            entries = [(k, v) for k, v in self.values.items()
+                       if k not in sent or abs(v - sent[k]) >= EPSILON.get(k, DEFAULT_EPSILON)]
+            if not entries and now - self._last_send < HEARTBEAT_S:
+                self._flush()
+                return
+            kind = b"D"
+        if len(self.buffer) > MAX_BUFFER:
+            # the link can't keep up; skip this frame and resync with a key frame
+            self.dropped += 1
+            self._next_key = 0.0
+        else:
+            self.buffer += encode(kind, entries)
+            self.frames += 1
+            for k, v in entries:
+                self.sent[k] = v
+            self._last_send = now
+        self._flush()
+
+    def _flush(self):
+        if not self.buffer or not self.connected:
+            return
+        try:
+            n = self.sock.send(self.buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._drop()
+            return
+        del self.buffer[:n]
+        self.bytes_sent += n
+
+    def close(self):
+        self._drop()
+
+class _Host:
+    __slots__ = ("name", "values", "last", "buffer", "frames", "bytes")
+
+    def __init__(self):
+        self.name = None
+        self.values = {}
+        self.last = time.monotonic()
+        self.buffer = bytearray()
+        self.frames = 0
+        self.bytes = 0
+
+class Aggregator:
+    def __init__(self, address=("0.0.0.0", DEFAULT_PORT)):
+        if isinstance(address, str):
+            address = parse_address(address, "0.0.0.0")
+        self.sel = selectors.DefaultSelector()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen(64)
+        self.server.setblocking(False)
+        self.address = self.server.getsockname()
+        self.sel.register(self.server, selectors.EVENT_READ, None)
+        self.lock = threading.Lock()
+        self.hosts = {}          # host name -> _Host (latest connection wins)
+        self._stop = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve, name="overlay-aggregator", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve(self):
+        while not self._stop:
+            for key, _ in self.sel.select(0.5):
+                if key.data is None:
+                    self._accept()
+                else:
+                    self._read(key.fileobj, key.data)
+        for key in list(self.sel.get_map().values()):
+            key.fileobj.close()
+        self.sel.close()
+
+    def _accept(self):
+        try:
+            conn, _ = self.server.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        self.sel.register(conn, selectors.EVENT_READ, _Host())
+
+    def _read(self, conn, host):
+        try:
+            data = conn.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.sel.unregister(conn)
+            conn.close()
+            return
+        host.buffer += data
+        host.bytes += len(data)
+        buf = host.buffer
+        off = 0
+        while len(buf) - off >= LENGTH.size:
+            (n,) = LENGTH.unpack_from(buf, off)
+            if len(buf) - off - LENGTH.size < n:
+                break
+            payload = bytes(buf[off + LENGTH.size:off + LENGTH.size + n])
+            off += LENGTH.size + n
+            self._frame(host, payload)
+        del buf[:off]
+
+    def _frame(self, host, payload):
+        kind = payload[:1]
+        host.last = time.monotonic()
+        host.frames += 1
+        if kind == b"H":
+            host.name = payload[1:].decode("utf-8", "replace")
+            with self.lock:
+                self.hosts[host.name] = host
+        elif kind == b"K":
+            host.values = decode_entries(payload)
+        elif kind == b"D":
+            if len(payload) > 1:
+                # copy on write so snapshot() readers never see a partial update
+                values = dict(host.values)
+                values.update(decode_entries(payload))
+                host.values = values
+
+    def snapshot(self, stale=STALE_S):
+        # [(host, values, stale)] sorted by host name
+        now = time.monotonic()
+        with self.lock:
+            for name in [n for n, h in self.hosts.items() if now - h.last > FORGET_S]:
+                del self.hosts[name]
+            hosts = list(self.hosts.values())
+        return sorted(((h.name, h.values, now - h.last > stale) for h in hosts), key=lambda r: r[0])
+
+    def stop(self):
+        self._stop = True
+        if self._thread is not None:
+            self._thread.join(2.0)
+
+def format_hosts(snapshot):
+    parts = []
+    for name, v, stale in snapshot:
+        if stale:
+            parts.append(f"{name} --")
+            continue
+        fields = [f"{label}{v[key]:.0f}" for label, key in (("C", "cpu_pct"), ("R", "ram_pct"), ("G", "gpu_pct"))
+                  if key in v]
+        parts.append(f"{name} {' '.join(fields)}")
+    return "  ".join(parts)
+
+def simulate(count, seconds=5.0):
+    # aggregator on an ephemeral localhost port and `count` fake agents, all
+    # driven from this one thread at 20 Hz
+    agg = Aggregator(("127.0.0.1", 0)).start()
+    address = f"127.0.0.1:{agg.address[1]}"
+    agents = [Agent(address, f"sim{i:02d}") for i in range(count)]
+    state = [{"cpu_pct": random.uniform(0, 100), "ram_pct": random.uniform(20, 80),
+              "gpu_pct": random.uniform(0, 100)} for _ in agents]
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for agent, st in zip(agents, state):
+            for k in st:
+                st[k] = min(100.0, max(0.0, st[k] + random.uniform(-3, 3)))
+            agent.update(st)
+        time.sleep(0.05)
+    time.sleep(0.2)
+    snap = agg.snapshot()
+    print(format_hosts(snap))
+    frames = sum(a.frames for a in agents)
+    sent = sum(a.bytes_sent for a in agents)
+    print(f"{len(snap)}/{count} hosts, {frames} frames, {sent / frames:.1f} bytes/frame, "
+          f"{sent / seconds / 1024:.1f} KB/s total, {sum(a.dropped for a in agents)} dropped")
+    for a in agents:
+        a.close()
+    agg.stop()
+    return snap
+
+if __name__ == "__main__":
+    if "--simulate" in sys.argv:
+        i = sys.argv.index("--simulate")
+        simulate(int(sys.argv[i + 1]) if len(sys.argv) > i + 1 else 8)
+    else:
+        print(__doc__)
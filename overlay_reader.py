@@ -0,0 +1,297 @@
+'''
+Shared-memory snapshot of the Useful Overlay stats, for other local processes.
+The overlay publishes its latest values into a named shared memory block; this
+module holds the binary layout, the writer used by the overlay and a small
+lock-free reader. Only the standard library is needed.
+
+Layout (little-endian, no padding):
+    header:  magic b"UOVL", layout version (u32), sequence (u64)
+    payload: see FIELDS below
+The sequence is a seqlock: the writer makes it odd, writes the payload, then
+makes it even again. A reader that sees the same even value before and after
+unpacking has a consistent snapshot; otherwise it retries, for at most
+READ_TIMEOUT seconds before raising TimeoutError (a writer killed in the middle
+of a publish leaves the sequence odd for good).
+
+Usage:
+    from overlay_reader import SnapshotReader
+    with SnapshotReader() as r:
+        snap = r.read()
+        print(snap.cpu_pct, snap.media_text)
+        print(r.get("mic_percent"))
+    python overlay_reader.py            (print the live snapshot)
+    python overlay_reader.py --bench    (reader / writer throughput)
+'''
+
+import math
+import struct
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+SHM_NAME = "UsefulOverlay"
+MAGIC = b"UOVL"
+LAYOUT_VERSION = 1
+
+HEADER = struct.Struct("<4sIQ")
+SEQ_OFFSET = 8
+READ_TIMEOUT = 0.1
+LIVE_WRITER_S = 3.0      # a block published to this recently belongs to a running overlay
+
+FIELDS = [
+    ("timestamp", "d"),
+    ("cpu_pct", "f"),
+    ("ram_pct", "f"),
+    ("gpu_pct", "f"),
+    ("battery_pct", "f"),
+    ("net_rx_bps", "d"),
+    ("net_tx_bps", "d"),
+    ("disk_read_bps", "d"),
+    ("disk_write_bps", "d"),
+    ("mic_percent", "f"),
+    ("media_playing", "B"),
+    ("media_position", "f"),
+    ("media_duration", "f"),
+    ("cpu_cell_count", "H"),
+    ("cpu_cells", "64s"),
+    ("media_len", "H"),
+    ("media_text", "256s"),
+    ("app_len", "H"),
+    ("app_name", "64s"),
+]
+PAYLOAD = struct.Struct("<" + "".join(f for _, f in FIELDS))
+SIZE = HEADER.size + PAYLOAD.size
+FIELD_NAMES = [n for n, _ in FIELDS]
+
+# offset / struct of every field, for single-value reads
+_FIELD_STRUCTS = {}
+_offset = HEADER.size
+for _name, _fmt in FIELDS:
+    _FIELD_STRUCTS[_name] = (_offset, struct.Struct("<" + _fmt))
+    _offset += struct.calcsize("<" + _fmt)
+
+Snapshot = namedtuple("Snapshot", [n for n in FIELD_NAMES if n not in ("cpu_cell_count", "media_len", "app_len")])
+
+# numeric stats keys the writer picks up, everything else is unknown (NaN)
+_NUMERIC = ("cpu_pct", "ram_pct", "gpu_pct", "battery_pct", "net_rx_bps", "net_tx_bps",
+            "disk_read_bps", "disk_write_bps", "mic_percent")
+
+def _attach(name, untrack=True):
+    # readers must not let the resource tracker unlink the overlay's block on exit
+    if not untrack:
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if sys.platform != "win32":
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return shm
+
+class SnapshotWriter:
+    def __init__(self, name=SHM_NAME):
+        self.seq = 0
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE)
+        except FileExistsError:
+            self.shm = _attach(name)
+            self._take_over(name)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, MAGIC, LAYOUT_VERSION, self.seq)
+        self.values = {n: math.nan for n in _NUMERIC}
+        self.media_playing = 0
+        self.media_position = math.nan
+        self.media_duration = math.nan
+        self.cpu_cells = b""
+        self.media_text = b""
+        self.app_name = b""
+
+    def _take_over(self, name):
+        # only a block left over from a crashed overlay is reused; one that is
+        # still being published belongs to another instance, two writers would
+        # break the seqlock
+        buf = self.shm.buf
+        if self.shm.size < SIZE:
+            self.shm.close()
+            raise FileExistsError(f"shared memory {name!r} exists with a different size")
+        magic, version, seq = HEADER.unpack_from(buf, 0)
+        if magic == MAGIC and version == LAYOUT_VERSION:
+            (ts,) = _FIELD_STRUCTS["timestamp"][1].unpack_from(buf, HEADER.size)
+            if abs(time.time() - ts) < LIVE_WRITER_S:
+                self.shm.close()
+                raise FileExistsError(f"shared memory {name!r} is in use by another running overlay")
+            # carry on from its sequence so attached readers never see it go back
+            self.seq = seq + (seq & 1)
+
+    def update(self, out):
+        # pick the keys we publish out of a probe output dict
+        values = self.values
+        for key in _NUMERIC:
+            if key in out:
+                values[key] = out[key]
+        if "cpu_cells" in out:
+            self.cpu_cells = out["cpu_cells"][:64]
+        if "spotify" in out:
+            self.media_text = out["spotify"].encode("utf-8")[:256]
+        if "app_name" in out:
+            self.app_name = out["app_name"].encode("utf-8")[:64]
+        if "media_timeline" in out:
+            tl = out["media_timeline"]
+            if tl is None:
+                self.media_playing, self.media_position, self.media_duration = 0, math.nan, math.nan
+            else:
+                pos, anchor, duration, rate = tl
+                self.media_playing = 1 if rate else 0
+                self.media_position = pos + (time.monotonic() - anchor) * rate
+                self.media_duration = duration
+
+    def publish(self):
+        v = self.values
+        buf = self.buf
+        self.seq += 1
+        struct.pack_into("<Q", buf, SEQ_OFFSET, self.seq)
+        PAYLOAD.pack_into(
+            buf, HEADER.size, time.time(),
+            v["cpu_pct"], v["ram_pct"], v["gpu_pct"], v["battery_pct"],
+            v["net_rx_bps"], v["net_tx_bps"], v["disk_read_bps"], v["disk_write_bps"],
+            v["mic_percent"], self.media_playing, self.media_position, self.media_duration,
+            len(self.cpu_cells), self.cpu_cells, len(self.media_text), self.media_text,
+            len(self.app_name), self.app_name)
+        self.seq += 1
+        struct.pack_into("<Q", buf, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        # a writer only exists for a block it created or took over from a
+        # crashed overlay, so the block is ours to remove
+        self.buf = None
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+class SnapshotReader:
+    def __init__(self, name=SHM_NAME, untrack=True):
+        # untrack=False only when the writer is our own child process and
+        # already shares our resource tracker (the benchmark)
+        self.shm = _attach(name, untrack)
+        self.buf = self.shm.buf
+        magic, version, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self.close()
+            raise ValueError(f"shared memory {name!r} has layout {magic!r} v{version}, expected v{LAYOUT_VERSION}")
+        self.retries = 0
+
+    def _retry(self, deadline, timeout):
+        # the clock is only read once a retry is needed, the usual read never touches it
+        self.retries += 1
+        now = time.monotonic()
+        if deadline is None:
+            return now + timeout
+        if now >= deadline:
+            raise TimeoutError(f"snapshot still being written after {timeout}s, writer stuck or gone")
+        return deadline
+
+    def read_raw(self, timeout=READ_TIMEOUT):
+        # consistent tuple of all payload fields, straight from the shared buffer
+        buf = self.buf
+        deadline = None
+        while True:
+            s1 = struct.unpack_from("<Q", buf, SEQ_OFFSET)[0]
+            if not s1 & 1:
+                values = PAYLOAD.unpack_from(buf, HEADER.size)
+                if struct.unpack_from("<Q", buf, SEQ_OFFSET)[0] == s1:
+                    return values
+            deadline = self._retry(deadline, timeout)
+
+    def read(self):
+        (ts, cpu, ram, gpu, batt, rx, tx, dr, dw, mic, playing, pos, dur,
+         n_cells, cells, media_len, media, app_len, app) = self.read_raw()
+        return Snapshot(ts, cpu, ram, gpu, batt, rx, tx, dr, dw, mic, playing, pos, dur,
+                        cells[:n_cells], media[:media_len].decode("utf-8", "replace"),
+                        app[:app_len].decode("utf-8", "replace"))
+
+    def get(self, field, timeout=READ_TIMEOUT):
+        # one numeric field without unpacking the rest
+        offset, st = _FIELD_STRUCTS[field]
+        buf = self.buf
+        deadline = None
+        while True:
+            s1 = struct.unpack_from("<Q", buf, SEQ_OFFSET)[0]
+            if not s1 & 1:
+                value = st.unpack_from(buf, offset)[0]
+                if struct.unpack_from("<Q", buf, SEQ_OFFSET)[0] == s1:
+                    return value
+            deadline = self._retry(deadline, timeout)
+
+    def close(self):
+        self.buf = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _bench_writer(name, seconds, rate):
+    w = SnapshotWriter(name)
+    out = {"cpu_pct": 0.0, "spotify": "Artist – Title", "app_name": "bench.exe", "cpu_cells": bytes(32)}
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        out["cpu_pct"] = float(n % 100)
+        w.update(out)
+        w.publish()
+        n += 1
+        if rate:
+            time.sleep(1.0 / rate)
+    print(f"writer: {n / seconds:,.0f} publishes/s")
+    time.sleep(0.5)
+    w.close()
+
+def bench(seconds=3.0):
+    # unthrottled writer (worst case for retries), then the overlay's ~20 Hz
+    for rate in (None, 20):
+        print(f"-- writer {'unthrottled' if rate is None else f'at {rate} Hz'}")
+        _bench_once(seconds, rate)
+
+def _bench_once(seconds, rate):
+    import multiprocessing
+    name = f"{SHM_NAME}_bench"
+    proc = multiprocessing.Process(target=_bench_writer, args=(name, seconds + 0.5, rate))
+    proc.start()
+    reader = None
+    while reader is None:
+        try:
+            reader = SnapshotReader(name, untrack=False)
+        except (FileNotFoundError, ValueError):
+            time.sleep(0.01)
+    for label, fn in (("read()", reader.read), ("get('cpu_pct')", lambda: reader.get("cpu_pct"))):
+        reader.retries = 0
+        n = 0
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < seconds / 2:
+            fn()
+            n += 1
+        dt = time.perf_counter() - t0
+        print(f"reader {label}: {n / dt:,.0f} reads/s, {dt / n * 1e6:.2f} us/read, "
+              f"{reader.retries} retries")
+    reader.close()
+    proc.join()
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+    else:
+        with SnapshotReader() as r:
+            for k, v in r.read()._asdict().items():
+                print(f"{k}: {v}")